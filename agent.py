@@ -1,15 +1,52 @@
 # agent.py
 
-import pybullet as p
 import numpy as np
+from agent_table import NO_ID, AgentTable, Column
+from event_log import EVENTS
+
+class TrackedField(Column):
+    """Table-backed Agent attribute that reports value changes to the agent's observer (the Protocol)."""
+
+    def __set__(self, obj, value):
+        column = obj.table.columns[self.name]
+        old = column.item(obj.row)
+        column[obj.row] = NO_ID if value is None and self.is_id else value
+        if obj.observer is not None:
+            if old == NO_ID and self.is_id:
+                old = None
+            if old != value:
+                obj.observer.on_agent_change(obj, self.name, old, value)
+
 
 class Agent:
-    def __init__(self, name, uid, task_name_map, policy, task_type_map):
+    # Fields the protocol indexes; changing them updates its task/helper/claim indexes
+    task = TrackedField()
+    assist_task_id = TrackedField()
+    reached_goal = TrackedField()
+    assisting = TrackedField()
+    sync_start = TrackedField()
+    waiting_for_sync = TrackedField()
+    priority = TrackedField()
+    # Only consumed by an attached TraceRecorder
+    backup_task = TrackedField()
+    started = TrackedField()
+    # Table-backed, unobserved
+    ready_to_start = Column()
+    initial_priority = Column()
+    claim_attempts = Column()
+    stuck_cooldown = Column()
+
+    def __init__(self, name, uid, task_name_map, policy, task_type_map, backend, table=None):
+        self.observer = None
         self.name = name
+        # Row of the shared AgentTable holding the fields above (a private one-row table if none is given)
+        self.table = table if table is not None else AgentTable(capacity=1)
+        self.row = self.table.add(self)
         self.id = uid
         self.task_name_map = task_name_map
         self.policy = policy
         self.task_type_map = task_type_map
+        self.backend = backend
 
         # === Task-related state ===
         self.task = None
@@ -29,12 +66,12 @@ class Agent:
         # === Motion-related info ===
         self.target_pos = None
         self.prev_pos = None
-        self.position_buffer = []
         self.stuck_cooldown = 0
 
         # === Logging/debugging ===
         self.last_log = None
         self.last_debug_key = None
+        self.pending_move = None  # (prev_task, prev_assist, height) between plan() and apply_step()
 
     def reset(self):
         self.task = None
@@ -47,12 +84,17 @@ class Agent:
         self.assisting = False
         self.target_pos = None
         self.prev_pos = None
-        self.position_buffer.clear()
+        self.table.clear_positions(self.row)
         self.stuck_cooldown = 0
         self.last_log = None
         self.last_debug_key = None
         self.assist_task_id = None
 
+    @property
+    def position_buffer(self):
+        """The agent's last 10 planar positions, oldest first (a (k, 2) copy of its table history)."""
+        return self.table.positions(self.row)
+
     def __repr__(self):
         return f"Agent({self.name}, Task={self.task_name_map.get(self.task, 'None')}, Prio={self.priority})"
 
@@ -65,40 +107,47 @@ class Agent:
     def get_effective_task(self):
         return self.task or self.assist_task_id
 
-    def update(self, protocol):
+    def update(self, protocol, state):
+        """Runs one full decision: plan, query the policy, apply the resulting step."""
+        obs = self.plan(protocol, state)
+        if obs is None:
+            return
+        self.apply_step(self.compute_step(obs, state), state)
+
+    def plan(self, protocol, state):
+        """Handles reach/sync bookkeeping; returns the policy observation, or None if the agent does not move."""
         # print(f"[DEBUG] update: {self.name} | task={self.task}, assist={self.assist_task_id}, backup={self.backup_task}, assisting={self.assisting}, reached={self.reached_goal}")
 
         prev_task = self.task
         prev_assist = self.assist_task_id
 
-        effective_task = self.task or self.assist_task_id
+        effective_task = prev_task or prev_assist
         if effective_task is None:
             if self.task is None and self.assist_task_id is not None:
-                print(f"[BUG] {self.name} has assist_task_id={self.assist_task_id} but task=None — likely assist logic incomplete")
+                EVENTS.warn("agent", "BUG", "%s has assist_task_id=%s but task=None — likely assist logic incomplete", self.name, self.assist_task_id)
             if self.task is None and not self.assisting:
-                print(f"[BUG] {self.name} has no task and is not assisting — task was likely lost silently")
+                EVENTS.warn("agent", "BUG", "%s has no task and is not assisting — task was likely lost silently", self.name)
             return
 
         # === Get current position ===
-        current_xy = np.array(p.getBasePositionAndOrientation(self.id)[0][:2])
+        current_pos = state.position(self.id)
+        current_xy = current_pos[:2].copy()
         self.prev_pos = current_xy
-        self.position_buffer.append(current_xy)
-        if len(self.position_buffer) > 10:
-            self.position_buffer.pop(0)
+        self.table.push_position(self.row, current_xy)
 
         # === Get target position ===
-        self.target_pos = np.array(p.getBasePositionAndOrientation(effective_task)[0][:2])
-        distance = np.linalg.norm(current_xy - self.target_pos)
+        self.target_pos = state.position(effective_task)[:2].copy()
+        distance = state.distances.get(self.id, effective_task)
 
         if distance < 0.1:
-            print(f"[REACHED] {self.name} reached {self.task_name_map.get(effective_task)} (assist={self.assisting})")
+            EVENTS.info("agent", "REACHED", "%s reached %s (assist=%s)", self.name, self.task_name_map.get(effective_task), self.assisting)
             
             if self.assisting:
-                print(f"[RESUME] {self.name} finished assist. Resuming original task.")
+                EVENTS.info("agent", "RESUME", "%s finished assist. Resuming original task.", self.name)
                 if self.backup_task is not None:
                     self.task = self.backup_task
                 else:
-                    print(f"[WARN] {self.name} has no backup_task after assist!")
+                    EVENTS.warn("agent", "WARN", "%s has no backup_task after assist!", self.name)
                     self.task = None
                 self.backup_task = None
                 self.assisting = False
@@ -120,24 +169,28 @@ class Agent:
         if is_coop_task:
             if not self.sync_start:
                 if self.last_log != "waiting":
-                    print(f"[WAITING] {self.name} waiting for sync_start on {self.task_name_map.get(effective_task)}")
+                    EVENTS.info("agent", "WAITING", "%s waiting for sync_start on %s", self.name, self.task_name_map.get(effective_task))
                     self.last_log = "waiting"
                 return
             if not self.started:
                 self.started = True
-                print(f"[START] {self.name} begins executing shared task {self.task_name_map.get(effective_task)}")
+                EVENTS.info("agent", "START", "%s begins executing shared task %s", self.name, self.task_name_map.get(effective_task))
                 self.last_log = "started"
         else:
             if not self.started:
                 self.started = True
-                print(f"[START] {self.name} begins solo/urgent task {self.task_name_map.get(effective_task)}")
+                EVENTS.info("agent", "START", "%s begins solo/urgent task %s", self.name, self.task_name_map.get(effective_task))
                 self.last_log = "started"
 
-        # === Get action from policy ===
-        obs = protocol.get_agent_obs(self, effective_task)
+        # === Observation for the policy ===
+        self.pending_move = (prev_task, prev_assist, float(current_pos[2]))
+        return protocol.get_agent_obs(self, effective_task, state)
+
+    def compute_step(self, obs, state):
+        """Queries the policy and returns a normalized planar step (may run off the main thread)."""
         if hasattr(self.policy, "predict_action"):
             try:
-                actions = self.policy.predict_action({'obs': obs}) if isinstance(obs, dict) else self.policy.predict_action(self)
+                actions = self.policy.predict_action({'obs': obs}) if isinstance(obs, dict) else self.policy.predict_action(self, state)
 
                 if isinstance(actions, np.ndarray):
                     step = actions[0] if actions.ndim == 2 else actions
@@ -150,19 +203,22 @@ class Agent:
                 step = step / norm * 0.01 if norm > 0.001 else np.zeros(2)
 
             except Exception as e:
-                print(f"[ERROR] {self.name} failed to compute action: {e}")
+                EVENTS.error("agent", "ERROR", "%s failed to compute action: %s", self.name, e)
                 step = np.zeros(2)
         else:
-            print(f"[ERROR] {self.name} policy has no predict_action method")
+            EVENTS.error("agent", "ERROR", "%s policy has no predict_action method", self.name)
             step = np.zeros(2)
+        return step
 
-        # === Apply movement ===
+    def apply_step(self, step, state):
+        """Moves the agent body by step (teleport) and writes the new position into the snapshot."""
+        prev_task, prev_assist, height = self.pending_move
+        self.pending_move = None
         new_pos = self.prev_pos + step
         if self.task != prev_task or self.assist_task_id != prev_assist:
-            print(f"[TRACK] {self.name} task changed from {prev_task} → {self.task}, assist_task_id: {prev_assist} → {self.assist_task_id}")
+            EVENTS.info("agent", "TRACK", "%s task changed from %s → %s, assist_task_id: %s → %s",
+                        self.name, prev_task, self.task, prev_assist, self.assist_task_id)
 
-        p.resetBasePositionAndOrientation(
-            self.id,
-            [float(new_pos[0]), float(new_pos[1]), p.getBasePositionAndOrientation(self.id)[0][2]],
-            [0, 0, 0, 1]
-        )
+        new_pos_3d = [float(new_pos[0]), float(new_pos[1]), height]
+        self.backend.reset_position(self.id, new_pos_3d)
+        state.set_position(self.id, new_pos_3d)
@@ -0,0 +1,134 @@
+# agent_table.py
+
+import numpy as np
+
+NO_ID = -1
+HISTORY = 10  # planar positions kept per agent
+
+# Column kinds: ids store None as -1, flags are bools, counters plain ints, floats default to NaN
+ID, FLAG, INT, FLOAT = "id", "flag", "int", "float"
+SCHEMA = {
+    "task": ID,
+    "assist_task_id": ID,
+    "backup_task": ID,
+    "priority": INT,
+    "initial_priority": INT,
+    "claim_attempts": INT,
+    "stuck_cooldown": INT,
+    "reached_goal": FLAG,
+    "assisting": FLAG,
+    "sync_start": FLAG,
+    "waiting_for_sync": FLAG,
+    "started": FLAG,
+    "ready_to_start": FLAG,
+    # Ring buffer of recent positions; position_count is the number ever pushed
+    "position_history": FLOAT,
+    "position_count": INT,
+}
+_SHAPES = {"position_history": (HISTORY, 2)}
+_DTYPES = {ID: np.int64, FLAG: np.bool_, INT: np.int64, FLOAT: np.float64}
+_DEFAULTS = {ID: NO_ID, FLAG: False, INT: 0, FLOAT: np.nan}
+
+
+def _column(name, capacity):
+    kind = SCHEMA[name]
+    return np.full((capacity,) + _SHAPES.get(name, ()), _DEFAULTS[kind], dtype=_DTYPES[kind])
+
+
+class Column:
+    """Agent attribute stored in the agent's AgentTable row instead of the instance dict."""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.is_id = SCHEMA[name] == ID
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        value = obj.table.columns[self.name].item(obj.row)
+        if self.is_id and value == NO_ID:
+            return None
+        return value
+
+    def __set__(self, obj, value):
+        if self.is_id and value is None:
+            value = NO_ID
+        obj.table.columns[self.name][obj.row] = value
+
+
+class AgentTable:
+    """
+    Structure-of-arrays storage for per-agent decision state: one NumPy column per SCHEMA
+    field, one row per agent. Agent attributes are views onto their row, so env-level
+    checks (who still moves, whose claim was rejected) run over whole columns.
+    """
+
+    def __init__(self, capacity=16):
+        self.size = 0
+        self.agents = []  # row -> Agent
+        self.row_of = {}  # name -> row
+        self.columns = {name: _column(name, capacity) for name in SCHEMA}
+
+    def __len__(self):
+        return self.size
+
+    def add(self, agent):
+        """Appends a row with default values for agent and returns its index."""
+        row = self.size
+        if row == len(self.columns["task"]):
+            self._grow(max(2 * row, 16))
+        self.size += 1
+        self.agents.append(agent)
+        self.row_of[agent.name] = row
+        return row
+
+    def _grow(self, capacity):
+        for name, col in self.columns.items():
+            grown = _column(name, capacity)
+            grown[:len(col)] = col
+            self.columns[name] = grown
+
+    def __getitem__(self, name):
+        """Returns the live (size,) column of a field."""
+        return self.columns[name][:self.size]
+
+    def nbytes(self):
+        return sum(col.nbytes for col in self.columns.values())
+
+    # === Position history ===
+    def push_position(self, row, xy):
+        count = self.columns["position_count"]
+        self.columns["position_history"][row, count[row] % HISTORY] = xy
+        count[row] += 1
+
+    def positions(self, row):
+        """Returns the row's last (up to HISTORY) planar positions, oldest first, as a (k, 2) copy."""
+        count = int(self.columns["position_count"][row])
+        slots = np.arange(max(count - HISTORY, 0), count) % HISTORY
+        return self.columns["position_history"][row, slots]
+
+    def clear_positions(self, row):
+        self.columns["position_count"][row] = 0
+        self.columns["position_history"][row] = np.nan
+
+    # === Vectorized queries ===
+    def moving_rows(self):
+        """Rows of agents that have not reached their goal, in agent order."""
+        return np.flatnonzero(~self["reached_goal"])
+
+    def unaccepted_rows(self, outcomes):
+        """
+        Rows of non-assisting agents whose task is not the one conflict resolution gave them,
+        i.e. outcomes.get(agent.task) != agent.name for a task that is not None.
+        """
+        task = self["task"]
+        candidates = ~self["assisting"] & (task != NO_ID)
+        if not outcomes:
+            return np.flatnonzero(candidates)
+        keys = np.fromiter(outcomes.keys(), dtype=np.int64, count=len(outcomes))
+        winners = np.fromiter((self.row_of.get(w, NO_ID) for w in outcomes.values()), dtype=np.int64, count=len(outcomes))
+        order = np.argsort(keys)
+        keys, winners = keys[order], winners[order]
+        pos = np.minimum(np.searchsorted(keys, task), len(keys) - 1)
+        accepted = (keys[pos] == task) & (winners[pos] == np.arange(self.size))
+        return np.flatnonzero(candidates & ~accepted)
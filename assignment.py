@@ -0,0 +1,169 @@
+# assignment.py
+
+import numpy as np
+from event_log import EVENTS
+
+def hungarian(cost):
+    """
+    Minimum-cost assignment on a rectangular cost matrix (shortest augmenting paths with potentials).
+    Args:
+        cost: (n_rows, n_cols) array
+    Returns:
+        list of (row, col) pairs; every row is matched when n_rows <= n_cols, every col otherwise
+    """
+    cost = np.asarray(cost, dtype=float)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+    if n == 0:
+        return []
+
+    # 1-indexed potentials; column 0 is the virtual start of each augmenting path
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    match = np.zeros(m + 1, dtype=int)  # match[j] = row (1-indexed) holding column j, 0 if free
+    way = np.zeros(m + 1, dtype=int)
+
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = match[j0]
+            free = ~used
+            free[0] = False
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free[1:] & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+
+            candidates = np.where(free[1:], minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+
+            u[match[used]] += delta
+            v[used] -= delta
+            minv[free] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        # Flip the augmenting path back to its root
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+
+    pairs = [(int(match[j]) - 1, j - 1) for j in range(1, m + 1) if match[j]]
+    if transposed:
+        pairs = [(c, r) for r, c in pairs]
+    return sorted(pairs)
+
+def auction(cost, eps_final=None, scale=5.0):
+    """
+    Near-optimal assignment by Bertsekas' auction (Jacobi bidding with epsilon scaling).
+    The matrix is padded to square with constant dummy entries, so the result is within
+    size * eps_final of the optimum.
+    Returns:
+        list of (row, col) pairs, like hungarian()
+    """
+    cost = np.asarray(cost, dtype=float)
+    n, m = cost.shape
+    if n == 0 or m == 0:
+        return []
+    size = max(n, m)
+    spread = float(cost.max() - cost.min()) or 1.0
+
+    benefit = np.zeros((size, size))
+    benefit[:n, :m] = cost.max() - cost  # maximize benefit == minimize cost
+    if size == 1:
+        return [(0, 0)]
+    if eps_final is None:
+        eps_final = spread * 1e-6 / size
+
+    prices = np.zeros(size)
+    eps = spread / 4
+    while True:
+        owner = np.full(size, -1)
+        assigned = np.full(size, -1)
+        while True:
+            bidders = np.flatnonzero(assigned < 0)
+            if not len(bidders):
+                break
+            values = benefit[bidders] - prices
+            best = np.argmax(values, axis=1)
+            rows = np.arange(len(bidders))
+            best_value = values[rows, best]
+            values[rows, best] = -np.inf
+            second_value = values.max(axis=1)
+            bids = prices[best] + best_value - second_value + eps
+
+            # Highest bid wins each object
+            order = np.lexsort((-bids, best))
+            objects, first = np.unique(best[order], return_index=True)
+            winners = bidders[order[first]]
+            win_bids = bids[order[first]]
+
+            previous = owner[objects]
+            assigned[previous[previous >= 0]] = -1
+            owner[objects] = winners
+            assigned[winners] = objects
+            prices[objects] = win_bids
+        if eps <= eps_final:
+            break
+        eps = max(eps / scale, eps_final)
+
+    return [(i, int(assigned[i])) for i in range(n) if assigned[i] < m]
+
+
+class AssignmentEngine:
+    """Resolves every claim conflict in one pass by solving an agent × task assignment problem."""
+    MODES = ("hungarian", "auction")
+
+    def __init__(self, mode="hungarian", claim_bonus=1.0):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown assignment mode '{mode}', expected one of {self.MODES}")
+        self.mode = mode
+        self.claim_bonus = claim_bonus  # cost discount per priority point on an agent's own claim
+
+    def cost_matrix(self, agents, task_ids, state):
+        """
+        Cost is the distance score used for priorities (10 × planar distance); an agent's
+        current claim is discounted by claim_bonus × priority so contested claims still
+        favour higher-priority agents.
+        """
+        cost = 10 * state.distances.block([a.id for a in agents], task_ids)
+
+        col_of = {t: j for j, t in enumerate(task_ids)}
+        for i, agent in enumerate(agents):
+            j = col_of.get(agent.task)
+            if j is not None:
+                cost[i, j] -= self.claim_bonus * agent.priority
+        return cost
+
+    def solve(self, cost):
+        if self.mode == "auction":
+            return auction(cost)
+        return hungarian(cost)
+
+    def assign(self, protocol, state):
+        """Collects claims, writes protocol.outcomes from the optimal matching, and returns success."""
+        protocol.receive_claims()
+
+        agents = list(protocol.agents.values())
+        task_ids = list(protocol.task_pool)
+        pairs = self.solve(self.cost_matrix(agents, task_ids, state))
+
+        matched = {agents[i].name: task_ids[j] for i, j in pairs}
+        protocol.clear_outcomes()
+        for agent in agents:
+            task = matched.get(agent.name)
+            if task != agent.task:
+                EVENTS.info("assign", "REASSIGN", "%s → %s (%s)", agent.name, protocol.task_name_map.get(task, 'None'), self.mode)
+            agent.task = task
+            if task is not None:
+                protocol.set_outcome(task, agent.name)
+
+        return protocol.resolve_outcomes()
@@ -0,0 +1,76 @@
+# assist_registry.py
+
+import itertools
+from message_queue import TimeWheel
+
+class AssistRegistry:
+    """Active assist requests indexed by task and by sender, with time-wheel expiry."""
+
+    def __init__(self, task_type_map):
+        self.task_type_map = task_type_map
+        self.requests = {}    # seq -> request, in insertion order
+        self.by_task = {}     # task_id -> {seq: request}, in insertion order
+        self.by_sender = {}   # sender -> {task_id: number of active requests}
+        self.cooperative = set()  # cooperative task_ids with at least one active request
+        self.expiry = TimeWheel()
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self.requests)
+
+    def __iter__(self):
+        return iter(list(self.requests.values()))
+
+    def add(self, msg):
+        """Indexes a request and schedules its removal at timestamp + ttl."""
+        seq = next(self._seq)
+        task_id, sender = msg.task_id, msg.sender
+        self.requests[seq] = msg
+        self.by_task.setdefault(task_id, {})[seq] = msg
+        tasks = self.by_sender.setdefault(sender, {})
+        tasks[task_id] = tasks.get(task_id, 0) + 1
+        if self.task_type_map.get(task_id) == "cooperative":
+            self.cooperative.add(task_id)
+        self.expiry.schedule(msg.expires_at, seq)
+
+    def _remove(self, seq):
+        msg = self.requests.pop(seq)
+        task_id, sender = msg.task_id, msg.sender
+        on_task = self.by_task[task_id]
+        del on_task[seq]
+        if not on_task:
+            del self.by_task[task_id]
+            self.cooperative.discard(task_id)
+        tasks = self.by_sender[sender]
+        tasks[task_id] -= 1
+        if not tasks[task_id]:
+            del tasks[task_id]
+            if not tasks:
+                del self.by_sender[sender]
+
+    def expire(self, now):
+        """Drops requests whose TTL has passed; returns how many were dropped."""
+        expired = self.expiry.expire(now)
+        for seq in expired:
+            self._remove(seq)
+        return len(expired)
+
+    def sender_of(self, task_id):
+        """Returns the sender of the oldest active request for task_id, or None."""
+        on_task = self.by_task.get(task_id)
+        if not on_task:
+            return None
+        return next(iter(on_task.values())).sender
+
+    def has_request(self, sender, task_id):
+        """Checks whether sender has an active request for task_id."""
+        return task_id in self.by_sender.get(sender, ())
+
+    def for_task(self, task_id):
+        return list(self.by_task.get(task_id, {}).values())
+
+    def pending_cooperative(self):
+        """Returns the active requests on cooperative tasks, oldest first."""
+        if len(self.cooperative) == len(self.by_task):
+            return list(self.requests.values())
+        return [r for r in self.requests.values() if r.task_id in self.cooperative]
@@ -0,0 +1,130 @@
+# async_runtime.py
+
+import asyncio
+import time
+
+class AsyncRuntime:
+    """
+    Drives a SimEnv with asyncio. A world coroutine ticks the protocol and physics, and
+    every agent runs as its own coroutine that decides at its own rate. Given an executor,
+    policy calls run off the event loop, so one slow policy no longer stalls the world or
+    the rest of the team.
+    """
+
+    def __init__(self, env, agent_rates=None, executor=None, tick_timeout=None, realtime_factor=None):
+        """
+        Args:
+            env: SimEnv whose tasks have already been assigned
+            agent_rates: {agent name: decisions per simulated second}; unlisted agents decide every tick
+            executor: concurrent.futures executor for policy calls; None runs them inline
+            tick_timeout: wall seconds the world waits for the agents due on a tick before stepping
+                without them; None waits for all (lockstep, same results as env.step())
+            realtime_factor: pace the world at this multiple of real time; None runs unpaced
+        """
+        self.env = env
+        self.agent_rates = agent_rates or {}
+        self.executor = executor
+        self.tick_timeout = tick_timeout
+        self.realtime_factor = realtime_factor
+
+        self.state = None
+        self.inflight = {}   # agent name -> future resolved when its current decision is applied
+        self.next_tick = {}  # agent name -> first tick at which it decides again
+        self.decisions = {}
+        self.skipped = {}    # due ticks missed because the previous decision was still running
+        self.errors = []
+        self.stopping = False
+
+    def period(self, name):
+        """Decision period of an agent in ticks."""
+        rate = self.agent_rates.get(name)
+        if not rate:
+            return 1
+        return max(1, round(1.0 / (rate * self.env.tick_duration)))
+
+    async def _decide(self, agent, state):
+        env = self.env
+        if not env.prepare_agent(agent):
+            return
+        obs = agent.plan(env.protocol, state)
+        if obs is None:
+            return
+        if self.executor is None:
+            step = agent.compute_step(obs, state)
+        else:
+            loop = asyncio.get_running_loop()
+            step = await loop.run_in_executor(self.executor, agent.compute_step, obs, state)
+        agent.apply_step(step, state)
+
+    async def _agent_loop(self, agent, go):
+        while True:
+            await go.wait()
+            go.clear()
+            if self.stopping:
+                return
+            try:
+                await self._decide(agent, self.state)
+                self.decisions[agent.name] += 1
+            except Exception as e:
+                self.errors.append(e)  # surfaced by the world loop
+            self.inflight.pop(agent.name).set_result(None)
+
+    async def _world_tick(self, go):
+        env = self.env
+        loop = asyncio.get_running_loop()
+        self.state = state = env.pre_tick()
+
+        dispatched = []
+        for agent in env.agents.values():  # agent order, so inline lockstep matches env.step()
+            name = agent.name
+            if self.next_tick[name] > state.tick:
+                continue
+            self.next_tick[name] = state.tick + self.period(name)
+            if name in self.inflight:
+                self.skipped[name] += 1
+                continue
+            self.inflight[name] = loop.create_future()
+            dispatched.append(self.inflight[name])
+            go[name].set()
+
+        if dispatched:
+            await asyncio.wait(dispatched, timeout=self.tick_timeout)
+        else:
+            await asyncio.sleep(0)  # let in-flight decisions make progress
+        if self.errors:
+            raise self.errors[0]
+        env.post_tick()
+
+    async def arun(self, num_ticks):
+        """Runs num_ticks world ticks; returns per-agent decision and skip counts."""
+        env = self.env
+        self.stopping = False
+        self.errors = []
+        go = {name: asyncio.Event() for name in env.agents}
+        for name in env.agents:
+            self.next_tick[name] = 0
+            self.decisions[name] = 0
+            self.skipped[name] = 0
+        workers = [asyncio.create_task(self._agent_loop(agent, go[agent.name])) for agent in env.agents.values()]
+
+        wall_start, sim_start = time.perf_counter(), env.sim_time
+        try:
+            for _ in range(num_ticks):
+                await self._world_tick(go)
+                if self.realtime_factor:
+                    ahead = (env.sim_time - sim_start) / self.realtime_factor - (time.perf_counter() - wall_start)
+                    await asyncio.sleep(max(0.0, ahead))
+        finally:
+            # Let late decisions land, then stop the agent coroutines
+            if self.inflight:
+                await asyncio.wait(list(self.inflight.values()))
+            self.stopping = True
+            for event in go.values():
+                event.set()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        return {"ticks": num_ticks, "decisions": dict(self.decisions), "skipped": dict(self.skipped)}
+
+    def run(self, num_ticks):
+        """Blocking wrapper around arun() for callers without an event loop."""
+        return asyncio.run(self.arun(num_ticks))
@@ -0,0 +1,229 @@
+# backends.py
+
+import contextlib
+import numpy as np
+
+try:
+    import pybullet as p
+    import pybullet_data
+except ImportError:  # the kinematic backend runs without PyBullet
+    p = None
+    pybullet_data = None
+
+IDENTITY_QUAT = (0.0, 0.0, 0.0, 1.0)
+
+class PyBulletBackend:
+    """Physics backend that owns one PyBullet client and passes its id to every call."""
+    name = "pybullet"
+
+    def __init__(self, time_step=1. / 240, gui=False):
+        if p is None:
+            raise ImportError("PyBulletBackend requires the 'pybullet' package")
+        self.time_step = time_step
+        self.sim_time = 0.0
+
+        self.gui = gui
+        self.client = p.connect(p.GUI if gui else p.DIRECT)
+        p.setAdditionalSearchPath(pybullet_data.getDataPath(), physicsClientId=self.client)
+        self._cube_shapes = None
+        self._configure()
+
+    def _configure(self):
+        p.setGravity(0, 0, -9.8, physicsClientId=self.client)
+        p.setTimeStep(self.time_step, physicsClientId=self.client)
+        p.setPhysicsEngineParameter(deterministicOverlappingPairs=1, physicsClientId=self.client)
+
+    def reset_world(self):
+        """Removes every body so the scene can be rebuilt."""
+        p.resetSimulation(physicsClientId=self.client)
+        self._cube_shapes = None
+        self._configure()
+        self.sim_time = 0.0
+
+    def load_plane(self):
+        return p.loadURDF("plane.urdf", physicsClientId=self.client)
+
+    def load_objects(self, positions):
+        """
+        Creates many task cubes at once. The cube's collision and visual shapes are
+        built once and shared, so no URDF is parsed per body; friction and inertia
+        match cube_small.urdf.
+        """
+        client = self.client
+        if self._cube_shapes is None:
+            col = p.createCollisionShape(p.GEOM_BOX, halfExtents=[0.025] * 3, physicsClientId=client)
+            vis = p.createVisualShape(p.GEOM_MESH, fileName="cube.obj", meshScale=[0.05] * 3,
+                                      rgbaColor=[1, 1, 1, 1], physicsClientId=client)
+            self._cube_shapes = (col, vis)
+        col, vis = self._cube_shapes
+
+        ids = []
+        with self._rendering_paused():
+            for pos in positions:
+                uid = p.createMultiBody(0.1, col, vis, list(pos), physicsClientId=client)
+                p.changeDynamics(uid, -1, lateralFriction=1.0, localInertiaDiagonal=[0.000125] * 3,
+                                 physicsClientId=client)
+                ids.append(uid)
+        return ids
+
+    def load_agents(self, positions, orn=IDENTITY_QUAT):
+        """Loads many r2d2 agents with cached graphics shapes and rendering paused."""
+        flags = p.URDF_ENABLE_CACHED_GRAPHICS_SHAPES
+        with self._rendering_paused():
+            return [p.loadURDF("r2d2.urdf", list(pos), orn, flags=flags, physicsClientId=self.client)
+                    for pos in positions]
+
+    @contextlib.contextmanager
+    def _rendering_paused(self):
+        # Rebuilding the GUI scene after every body dominates bulk loads in GUI mode
+        if self.gui:
+            p.configureDebugVisualizer(p.COV_ENABLE_RENDERING, 0, physicsClientId=self.client)
+        try:
+            yield
+        finally:
+            if self.gui:
+                p.configureDebugVisualizer(p.COV_ENABLE_RENDERING, 1, physicsClientId=self.client)
+
+    def get_position(self, uid):
+        return np.array(p.getBasePositionAndOrientation(uid, physicsClientId=self.client)[0])
+
+    def reset_position(self, uid, pos, orn=IDENTITY_QUAT):
+        p.resetBasePositionAndOrientation(uid, pos, orn, physicsClientId=self.client)
+
+    def save_state(self):
+        """Snapshots the whole world in memory and returns the PyBullet state id."""
+        return p.saveState(physicsClientId=self.client)
+
+    def restore_state(self, state_id):
+        """Restores a snapshot taken with save_state; the bodies must still exist."""
+        p.restoreState(stateId=state_id, physicsClientId=self.client)
+        self.sim_time = 0.0
+
+    def capture(self, state):
+        """Fills a WorldState with one pose and one velocity query per body."""
+        client = self.client
+        for i, uid in enumerate(state.body_ids):
+            pos, orn = p.getBasePositionAndOrientation(uid, physicsClientId=client)
+            lin_vel, ang_vel = p.getBaseVelocity(uid, physicsClientId=client)
+            state.positions[i] = pos
+            state.orientations[i] = orn
+            state.linear_velocities[i] = lin_vel
+            state.angular_velocities[i] = ang_vel
+
+    def step(self):
+        p.stepSimulation(physicsClientId=self.client)
+        self.sim_time += self.time_step
+
+    def close(self):
+        p.disconnect(physicsClientId=self.client)
+
+
+class KinematicBackend:
+    """Pure-NumPy backend: bodies are rows in arrays and only move when teleported."""
+    name = "kinematic"
+
+    def __init__(self, time_step=1. / 240, capacity=64):
+        self.client = None
+        self.time_step = time_step
+        self.sim_time = 0.0
+        self.num_bodies = 0
+
+        self.positions = np.zeros((capacity, 3))
+        self.orientations = np.tile(IDENTITY_QUAT, (capacity, 1))
+        self.linear_velocities = np.zeros((capacity, 3))
+        self.angular_velocities = np.zeros((capacity, 3))
+
+    def reset_world(self):
+        """Drops every body; the arrays keep their capacity for the next scene."""
+        self.num_bodies = 0
+        self.sim_time = 0.0
+        self.orientations[:] = IDENTITY_QUAT
+        self.linear_velocities[:] = 0.0
+        self.angular_velocities[:] = 0.0
+
+    def _add_body(self, pos, orn=IDENTITY_QUAT):
+        if self.num_bodies == len(self.positions):
+            self._grow(2 * len(self.positions))
+        uid = self.num_bodies
+        self.positions[uid] = pos
+        self.orientations[uid] = orn
+        self.num_bodies += 1
+        return uid
+
+    def _grow(self, capacity):
+        extra = capacity - len(self.positions)
+        self.positions = np.vstack([self.positions, np.zeros((extra, 3))])
+        self.orientations = np.vstack([self.orientations, np.tile(IDENTITY_QUAT, (extra, 1))])
+        self.linear_velocities = np.vstack([self.linear_velocities, np.zeros((extra, 3))])
+        self.angular_velocities = np.vstack([self.angular_velocities, np.zeros((extra, 3))])
+
+    def load_plane(self):
+        # Body 0 is the ground, matching PyBullet's id numbering
+        return self._add_body((0.0, 0.0, 0.0))
+
+    def _add_bodies(self, positions, orn=IDENTITY_QUAT):
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        start, n = self.num_bodies, len(positions)
+        if start + n > len(self.positions):
+            self._grow(max(2 * len(self.positions), start + n))
+        self.positions[start:start + n] = positions
+        self.orientations[start:start + n] = orn
+        self.num_bodies += n
+        return list(range(start, start + n))
+
+    def load_objects(self, positions):
+        return self._add_bodies(positions)
+
+    def load_agents(self, positions, orn=IDENTITY_QUAT):
+        return self._add_bodies(positions, orn)
+
+    def get_position(self, uid):
+        return self.positions[uid].copy()
+
+    def reset_position(self, uid, pos, orn=IDENTITY_QUAT):
+        self.positions[uid] = pos
+        self.orientations[uid] = orn
+
+    def save_state(self):
+        """Returns a copy of every body array."""
+        n = self.num_bodies
+        return (n, self.positions[:n].copy(), self.orientations[:n].copy(),
+                self.linear_velocities[:n].copy(), self.angular_velocities[:n].copy())
+
+    def restore_state(self, saved):
+        """Restores the body arrays from a save_state snapshot."""
+        n, positions, orientations, linear_velocities, angular_velocities = saved
+        self.num_bodies = n
+        self.positions[:n] = positions
+        self.orientations[:n] = orientations
+        self.linear_velocities[:n] = linear_velocities
+        self.angular_velocities[:n] = angular_velocities
+        self.sim_time = 0.0
+
+    def capture(self, state):
+        """Fills a WorldState with a single fancy-indexed copy per field."""
+        rows = state.id_array
+        state.positions[:] = self.positions[rows]
+        state.orientations[:] = self.orientations[rows]
+        state.linear_velocities[:] = self.linear_velocities[rows]
+        state.angular_velocities[:] = self.angular_velocities[rows]
+
+    def step(self):
+        self.sim_time += self.time_step
+
+    def close(self):
+        pass
+
+
+BACKENDS = {
+    PyBulletBackend.name: PyBulletBackend,
+    KinematicBackend.name: KinematicBackend,
+}
+
+def make_backend(backend="pybullet", **kwargs):
+    """Returns a backend instance from a name, or passes an existing instance through."""
+    if not isinstance(backend, str):
+        return backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[backend](**kwargs)
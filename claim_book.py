@@ -0,0 +1,71 @@
+# claim_book.py
+
+import heapq
+
+class ClaimBook:
+    """Per-task max-heaps of (priority, agent) claims, updated only for claims that changed."""
+
+    def __init__(self, agent_names):
+        # Ties go to the lexicographically larger name, like sorting (priority, name) descending
+        self.tie_rank = {name: i for i, name in enumerate(sorted(agent_names, reverse=True))}
+        self.current = {}      # agent name -> (task_id, priority) of its live claim
+        self.heaps = {}        # task_id -> heap of (-priority, tie_rank, name); stale entries dropped lazily
+        self.counts = {}       # task_id -> number of live claims
+        self.dirty_tasks = {}  # tasks whose winner may have changed, in the order they were touched
+
+    def update(self, name, task, priority):
+        """Records an agent's current claim (task None withdraws it); returns whether it changed."""
+        claim = (task, priority) if task is not None else None
+        old = self.current.get(name)
+        if old == claim:
+            return False
+        if old is not None:
+            self.counts[old[0]] -= 1
+            self.dirty_tasks[old[0]] = None
+        if claim is None:
+            del self.current[name]
+            return True
+
+        self.current[name] = claim
+        self.counts[task] = self.counts.get(task, 0) + 1
+        heap = self.heaps.setdefault(task, [])
+        heapq.heappush(heap, (-priority, self.tie_rank[name], name))
+        if len(heap) > 2 * self.counts[task] + 8:
+            self._compact(task)
+        self.dirty_tasks[task] = None
+        return True
+
+    def _compact(self, task):
+        """Keeps one entry per live claim; re-entered claims leave identical copies behind."""
+        seen = set()
+        heap = []
+        for e in self.heaps[task]:
+            if e[2] not in seen and self.current.get(e[2]) == (task, -e[0]):
+                seen.add(e[2])
+                heap.append(e)
+        heapq.heapify(heap)
+        self.heaps[task] = heap
+
+    def winner(self, task):
+        """Returns the highest-priority live claimant of task, or None."""
+        heap = self.heaps.get(task)
+        if not heap:
+            return None
+        if len(heap) == 1 and self.counts[task] == 1:
+            return heap[0][2]  # uncontested: the only entry is the live claim
+        while heap and self.current.get(heap[0][2]) != (task, -heap[0][0]):
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def evaluate(self):
+        """Returns {task: winner or None} for every task touched since the last call."""
+        results = {}
+        for task in self.dirty_tasks:
+            if self.counts.get(task):
+                results[task] = self.winner(task)
+            else:
+                results[task] = None
+                self.heaps.pop(task, None)
+                self.counts.pop(task, None)
+        self.dirty_tasks.clear()
+        return results
@@ -0,0 +1,32 @@
+# clock.py
+
+import time
+
+class SimClock:
+    """Simulated time in seconds, advanced explicitly by the environment once per tick."""
+
+    def __init__(self, start=0.0):
+        self.start = start
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def advance(self, dt):
+        self.now += dt
+
+    def reset(self):
+        self.now = self.start
+
+
+class WallClock:
+    """Real time; advance/reset are no-ops, so protocol timing follows the host clock."""
+
+    def time(self):
+        return time.time()
+
+    def advance(self, dt):
+        pass
+
+    def reset(self):
+        pass
@@ -0,0 +1,97 @@
+# distance_matrix.py
+
+import numpy as np
+
+class DistanceMatrix:
+    """
+    Agent × task planar distances. update() only records positions and marks the rows of
+    moved agents and the columns of moved tasks stale; they are recomputed on first read.
+    """
+
+    def __init__(self, agent_ids, task_ids):
+        self.agent_ids = list(agent_ids)
+        self.task_ids = list(task_ids)
+        self.agent_index = {uid: i for i, uid in enumerate(self.agent_ids)}
+        self.task_index = {uid: j for j, uid in enumerate(self.task_ids)}
+
+        self._distances = np.zeros((len(self.agent_ids), len(self.task_ids)))
+        self.agent_xy = np.full((len(self.agent_ids), 2), np.nan)
+        self.task_xy = np.full((len(self.task_ids), 2), np.nan)
+        self.stale_rows = np.zeros(len(self.agent_ids), dtype=bool)
+        self.stale_cols = np.zeros(len(self.task_ids), dtype=bool)
+        self.rows_updated = 0  # rows recomputed since the last update, for profiling
+
+    def update(self, agent_xy, task_xy):
+        """Records the latest positions and marks moved agents' rows and moved tasks' columns stale."""
+        moved_tasks = np.any(task_xy != self.task_xy, axis=1)
+        if moved_tasks.any():
+            self.task_xy[moved_tasks] = task_xy[moved_tasks]
+            self.stale_cols |= moved_tasks
+
+        moved_agents = np.any(agent_xy != self.agent_xy, axis=1)
+        if moved_agents.any():
+            self.agent_xy[moved_agents] = agent_xy[moved_agents]
+            self.stale_rows |= moved_agents
+        self.rows_updated = 0
+
+    # === Lazy refresh ===
+    def _refresh_cols(self):
+        cols = np.flatnonzero(self.stale_cols)
+        self._distances[:, cols] = np.linalg.norm(
+            self.agent_xy[:, None, :] - self.task_xy[None, cols, :], axis=2)
+        self.stale_cols[:] = False
+
+    def _refresh_rows(self, rows):
+        """Recomputes the stale rows among `rows` (indices into agent_ids)."""
+        if self.stale_cols.any():
+            self._refresh_cols()
+        rows = np.asarray(rows, dtype=np.int64)
+        rows = rows[self.stale_rows[rows]]
+        if len(rows):
+            rows = np.unique(rows)
+            self._distances[rows] = np.linalg.norm(
+                self.agent_xy[rows, None, :] - self.task_xy[None, :, :], axis=2)
+            self.stale_rows[rows] = False
+            self.rows_updated += len(rows)
+
+    def _fresh_row(self, i):
+        if self.stale_rows[i] or self.stale_cols.any():
+            self._refresh_rows([i])
+        return self._distances[i]
+
+    # === Queries ===
+    @property
+    def distances(self):
+        """The full (num_agents, num_tasks) matrix, brought up to date."""
+        self._refresh_rows(np.flatnonzero(self.stale_rows))
+        return self._distances
+
+    def block(self, agent_ids, task_ids):
+        """Returns the (len(agent_ids), len(task_ids)) sub-matrix, refreshing only those agents' rows."""
+        rows = [self.agent_index[a] for a in agent_ids]
+        cols = [self.task_index[t] for t in task_ids]
+        self._refresh_rows(rows)
+        return self._distances[np.ix_(rows, cols)]
+
+    def get(self, agent_id, task_id):
+        """Returns the distance from an agent to a task; a stale cell is computed on its own, not cached."""
+        i, j = self.agent_index[agent_id], self.task_index[task_id]
+        if self.stale_rows[i] or self.stale_cols[j]:
+            dx, dy = self.agent_xy[i] - self.task_xy[j]
+            return np.sqrt(dx * dx + dy * dy)  # same arithmetic as np.linalg.norm over a row
+        return self._distances[i, j]
+
+    def row(self, agent_id):
+        """Returns the (num_tasks,) distance row of an agent, ordered like task_ids."""
+        return self._fresh_row(self.agent_index[agent_id])
+
+    def mean_distance(self, agent_id):
+        """Returns the average distance from an agent to every task."""
+        return float(self.row(agent_id).mean()) if self.task_ids else 0.0
+
+    def nearest(self, agent_id, task_pool):
+        """Returns the task in task_pool closest to the agent, or None for an empty pool."""
+        if not task_pool:
+            return None
+        cols = [self.task_index[t] for t in task_pool]
+        return task_pool[int(np.argmin(self.row(agent_id)[cols]))]
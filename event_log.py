@@ -0,0 +1,119 @@
+# event_log.py
+
+import queue
+import threading
+import time
+from collections import deque
+
+DEBUG, INFO, WARN, ERROR, OFF = 10, 20, 30, 40, 100
+LEVELS = {"debug": DEBUG, "info": INFO, "warn": WARN, "error": ERROR, "off": OFF}
+
+_STOP = object()
+
+
+def format_record(record):
+    """Renders a (time, level, component, tag, fmt, args) record as '[TAG] message'."""
+    _, _, _, tag, fmt, args = record
+    text = fmt % args if args else fmt
+    return f"[{tag}] {text}" if tag else text
+
+
+class EventLog:
+    """
+    Leveled event log with per-component thresholds and lazy %-formatting. Records are
+    kept unformatted in a ring buffer; they are only rendered when echoed to stdout,
+    written to a file (optionally from a background thread) or read back.
+    """
+
+    def __init__(self, level=INFO, component_levels=None, echo=True, capacity=4096, path=None, background=False):
+        self.lock = threading.Lock()
+        self.writer = None
+        self.file = None
+        self.configure(level, component_levels, echo, capacity, path, background)
+
+    def configure(self, level=INFO, component_levels=None, echo=True, capacity=4096, path=None, background=False):
+        """Re-applies every setting in place, so modules holding a reference keep working."""
+        self.close()
+        self.level = LEVELS.get(level, level)
+        self.component_levels = {c: LEVELS.get(l, l) for c, l in (component_levels or {}).items()}
+        self.echo = echo
+        self.buffer = deque(maxlen=capacity) if capacity else None
+        if path is not None:
+            self.file = open(path, "a", buffering=1 << 16)
+            if background:
+                self.queue = queue.Queue()
+                self.writer = threading.Thread(target=self._write_loop, name="event-log-writer", daemon=True)
+                self.writer.start()
+
+    def enabled(self, level, component):
+        return level >= self.component_levels.get(component, self.level)
+
+    def log(self, level, component, tag, fmt, *args):
+        """Records an event; fmt % args is only evaluated if something consumes the text."""
+        if level < self.component_levels.get(component, self.level):
+            return
+        record = (time.time(), level, component, tag, fmt, args)
+        if self.buffer is not None:
+            self.buffer.append(record)
+        if self.echo:
+            print(format_record(record))
+        if self.writer is not None:
+            self.queue.put(record)
+        elif self.file is not None:
+            with self.lock:
+                self.file.write(format_record(record) + "\n")
+
+    def debug(self, component, tag, fmt, *args):
+        self.log(DEBUG, component, tag, fmt, *args)
+
+    def info(self, component, tag, fmt, *args):
+        self.log(INFO, component, tag, fmt, *args)
+
+    def warn(self, component, tag, fmt, *args):
+        self.log(WARN, component, tag, fmt, *args)
+
+    def error(self, component, tag, fmt, *args):
+        self.log(ERROR, component, tag, fmt, *args)
+
+    def records(self, component=None, tag=None):
+        """Formatted lines from the ring buffer, oldest first, optionally filtered."""
+        if self.buffer is None:
+            return []
+        return [
+            format_record(r) for r in list(self.buffer)
+            if (component is None or r[2] == component) and (tag is None or r[3] == tag)
+        ]
+
+    def clear(self):
+        if self.buffer is not None:
+            self.buffer.clear()
+
+    def _write_loop(self):
+        while True:
+            record = self.queue.get()
+            if record is _STOP:
+                self.queue.task_done()
+                return
+            self.file.write(format_record(record) + "\n")
+            self.queue.task_done()
+
+    def flush(self):
+        """Blocks until every queued record has reached the file."""
+        if self.writer is not None:
+            self.queue.join()
+        if self.file is not None:
+            with self.lock:
+                self.file.flush()
+
+    def close(self):
+        if self.writer is not None:
+            self.queue.put(_STOP)
+            self.writer.join()
+            self.writer = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+# Shared by agents, protocol and env; reconfigure with EVENTS.configure(...)
+EVENTS = EventLog()
@@ -1,18 +1,40 @@
 import sys
 sys.path.insert(0, "./dp_repo")
 
-import pybullet as p
-import pybullet_data
+import argparse
 import time
-import numpy as np
-import sys
-
-sys.path.insert(0, "./dp_repo")
 
+from backends import make_backend
+from event_log import EVENTS, LEVELS
 from sim_env import SimEnv
 
+# === Run-mode options ===
+parser = argparse.ArgumentParser(description="Run the multi-agent MCP simulation")
+parser.add_argument("--ticks", type=int, default=1000, help="number of decision ticks to run")
+parser.add_argument("--backend", choices=["pybullet", "kinematic"], default="pybullet")
+parser.add_argument("--gui", action="store_true", help="open the PyBullet GUI instead of DIRECT mode")
+parser.add_argument("--frame-skip", type=int, default=1, help="physics substeps per decision tick")
+parser.add_argument("--realtime-factor", type=float, default=1.0,
+                    help="simulated seconds per wall-clock second; 0 runs as fast as possible")
+parser.add_argument("--max-speed", action="store_true", help="headless run without pacing (same as --realtime-factor 0)")
+parser.add_argument("--comm-radius", type=float, default=None,
+                    help="agents only exchange protocol messages within this planar distance (default: unlimited)")
+parser.add_argument("--log-level", choices=list(LEVELS), default="info", help="minimum level of echoed protocol events")
+parser.add_argument("--log-file", metavar="PATH", help="also write events to PATH from a background thread")
+parser.add_argument("--metrics", metavar="PATH", help="write protocol communication metrics for the run to a JSON file")
+parser.add_argument("--trace", metavar="PATH",
+                    help="record poses, agent fields, messages and outcomes of every tick to a binary trace")
+args = parser.parse_args()
+if args.gui and args.backend != "pybullet":
+    parser.error(f"--gui requires --backend pybullet (the {args.backend} backend has no GUI)")
+
+realtime_factor = 0.0 if args.max_speed else args.realtime_factor
+EVENTS.configure(level=args.log_level, path=args.log_file, background=args.log_file is not None)
+backend = make_backend(args.backend, **({"gui": True} if args.gui else {}))
+
 # === Create simulation environment ===
-env = SimEnv(num_agents=3, num_objects=3)
+env = SimEnv(num_agents=3, num_objects=3, backend=backend, frame_skip=args.frame_skip,
+             comm_radius=args.comm_radius, metrics=bool(args.metrics))
 
 # === Distribute tasks ===
 env.assign_tasks(conflict_ratio=0.8)
@@ -23,9 +45,30 @@ for obj_id, task_type in env.task_type_map.items():
     print(f"  - {env.task_name_map[obj_id]}: {task_type}")
 print("=============================\n")
 
+if args.trace:
+    env.start_trace(args.trace)
+
 # === Main execution loop ===
-for _ in range(1000):
+# Pacing follows the simulated clock: we only wait while wall time is ahead of
+# sim_time / realtime_factor, and never wait at all when the factor is 0.
+wall_start = time.perf_counter()
+sim_start = env.sim_time
+for _ in range(args.ticks):
     env.step()
-    time.sleep(1. / 240)
+    if realtime_factor > 0:
+        ahead = (env.sim_time - sim_start) / realtime_factor - (time.perf_counter() - wall_start)
+        if ahead > 0:
+            time.sleep(ahead)
+
+wall_elapsed = time.perf_counter() - wall_start
+sim_elapsed = env.sim_time - sim_start
+print(f"\n[RUN] {args.ticks} ticks, sim={sim_elapsed:.2f}s, wall={wall_elapsed:.2f}s, "
+      f"achieved RTF={sim_elapsed / wall_elapsed if wall_elapsed > 0 else float('inf'):.1f}")
+if args.metrics:
+    summary = env.export_metrics(args.metrics)
+    print(f"[METRICS] {summary['total_messages']} messages, {summary['total_bytes']} bytes → {args.metrics}")
+if args.trace:
+    print(f"[TRACE] {env.recorder.ticks_recorded} ticks → {args.trace}")
 
 env.close()
+EVENTS.close()
@@ -0,0 +1,109 @@
+# message_queue.py
+
+import heapq
+import math
+from collections import deque
+
+class TimeWheel:
+    """Deadline buckets of fixed width; expiring only touches the buckets that have come due."""
+
+    def __init__(self, resolution=0.25):
+        self.resolution = resolution
+        self.slots = {}  # slot index -> [(expiry, item), ...]
+        self.heap = []   # slot indices that currently hold entries
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def schedule(self, expiry, item):
+        """Registers item to expire once the clock passes expiry."""
+        slot = math.floor(expiry / self.resolution)
+        bucket = self.slots.get(slot)
+        if bucket is None:
+            bucket = self.slots[slot] = []
+            heapq.heappush(self.heap, slot)
+        bucket.append((expiry, item))
+        self.size += 1
+
+    def expire(self, now):
+        """Removes and returns every item whose expiry is strictly before now."""
+        expired = []
+        while self.heap and self.heap[0] * self.resolution < now:
+            slot = self.heap[0]
+            bucket = self.slots[slot]
+            remaining = [(t, item) for t, item in bucket if t >= now]
+            expired.extend(item for t, item in bucket if t < now)
+            if remaining:
+                # The rest of this bucket is still live, and so is every later bucket
+                self.slots[slot] = remaining
+                break
+            heapq.heappop(self.heap)
+            del self.slots[slot]
+        self.size -= len(expired)
+        return expired
+
+
+class _Envelope:
+    __slots__ = ("receiver", "timestamp", "msg", "alive")
+
+    def __init__(self, receiver, timestamp, msg):
+        self.receiver = receiver
+        self.timestamp = timestamp
+        self.msg = msg
+        self.alive = True
+
+
+class MessageQueue:
+    """Per-receiver FIFO mailboxes with time-wheel expiry and consuming reads."""
+
+    def __init__(self, receivers, resolution=0.25):
+        self.boxes = {name: deque() for name in receivers}
+        self.live = {name: 0 for name in receivers}
+        self.wheel = TimeWheel(resolution)
+
+    def __contains__(self, receiver):
+        return receiver in self.boxes
+
+    def push(self, receiver, msg, timestamp, ttl):
+        """Queues msg for receiver; it is dropped once timestamp + ttl has passed."""
+        env = _Envelope(receiver, timestamp, msg)
+        self.boxes[receiver].append(env)
+        self.live[receiver] += 1
+        self.wheel.schedule(timestamp + ttl, env)
+
+    def pop_all(self, receiver):
+        """Returns and removes every live message for receiver, oldest first."""
+        box = self.boxes.get(receiver)
+        if not box:
+            return []
+        msgs = []
+        while box:
+            env = box.popleft()
+            if env.alive:
+                env.alive = False
+                msgs.append(env.msg)
+        self.live[receiver] = 0
+        return msgs
+
+    def peek(self, receiver):
+        """Returns the live messages for receiver without consuming them."""
+        return [env.msg for env in self.boxes.get(receiver, ()) if env.alive]
+
+    def depth(self, receiver):
+        return self.live.get(receiver, 0)
+
+    def expire(self, now):
+        """Drops messages whose TTL ran out; returns how many were dropped."""
+        dropped = 0
+        for env in self.wheel.expire(now):
+            if not env.alive:
+                continue  # already delivered
+            env.alive = False
+            self.live[env.receiver] -= 1
+            dropped += 1
+            # Expired envelopes are normally at the front; trim them without scanning the rest
+            box = self.boxes[env.receiver]
+            while box and not box[0].alive:
+                box.popleft()
+        return dropped
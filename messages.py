@@ -0,0 +1,83 @@
+# messages.py
+
+import struct
+from enum import IntEnum
+
+class MsgKind(IntEnum):
+    CLAIM = 1
+    RESPOND = 2
+    REQUEST_ASSIST = 3
+    ACK_ASSIST = 4
+    SYNC_START = 5
+
+
+# kind, sender length, task_id (-1 for None), priority, urgency, timestamp, ttl; sender utf-8 follows
+_HEADER = struct.Struct("<BBqiidd")
+NO_TASK = -1
+
+
+class Message:
+    """Fixed-layout protocol message; packs to a compact binary record."""
+    __slots__ = ("kind", "sender", "task_id", "priority", "urgency", "timestamp", "ttl")
+
+    def __init__(self, kind, sender, task_id=None, priority=0, urgency=0, timestamp=0.0, ttl=0.0):
+        self.kind = MsgKind(kind)
+        self.sender = sender
+        self.task_id = task_id
+        self.priority = priority
+        self.urgency = urgency
+        self.timestamp = timestamp
+        self.ttl = ttl
+
+    def __repr__(self):
+        return (f"Message({self.kind.name}, sender={self.sender}, task={self.task_id}, "
+                f"prio={self.priority}, t={self.timestamp:.3f})")
+
+    def __eq__(self, other):
+        if not isinstance(other, Message):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    def packed_size(self):
+        return encoded_size(self.sender)
+
+    @property
+    def expires_at(self):
+        return self.timestamp + self.ttl
+
+    def pack(self):
+        """Encodes the message as bytes (header + sender name)."""
+        name = self.sender.encode("utf-8")
+        task = NO_TASK if self.task_id is None else self.task_id
+        return _HEADER.pack(self.kind, len(name), task, self.priority, self.urgency,
+                            self.timestamp, self.ttl) + name
+
+    @classmethod
+    def unpack_from(cls, buf, offset=0):
+        """Decodes one message at offset; returns (message, offset just past it)."""
+        kind, name_len, task, priority, urgency, timestamp, ttl = _HEADER.unpack_from(buf, offset)
+        start = offset + _HEADER.size
+        sender = bytes(buf[start:start + name_len]).decode("utf-8")
+        task_id = None if task == NO_TASK else task
+        return cls(kind, sender, task_id, priority, urgency, timestamp, ttl), start + name_len
+
+    @classmethod
+    def unpack(cls, buf):
+        return cls.unpack_from(buf)[0]
+
+
+def encoded_size(sender):
+    """Size in bytes of a packed message from sender."""
+    return _HEADER.size + len(sender.encode("utf-8"))
+
+def pack_batch(msgs):
+    """Concatenates packed messages behind a uint32 count."""
+    return struct.pack("<I", len(msgs)) + b"".join(m.pack() for m in msgs)
+
+def unpack_batch(buf):
+    (count,) = struct.unpack_from("<I", buf)
+    offset, msgs = 4, []
+    for _ in range(count):
+        msg, offset = Message.unpack_from(buf, offset)
+        msgs.append(msg)
+    return msgs
@@ -0,0 +1,111 @@
+# metrics.py
+
+import bisect
+import json
+import math
+from collections import Counter
+
+from messages import MsgKind, encoded_size
+
+TIME_EDGES = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0)  # seconds
+DEPTH_EDGES = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+class Histogram:
+    """Fixed-bucket histogram; bucket i counts values in (edges[i-1], edges[i]], the last one overflow."""
+
+    def __init__(self, edges):
+        self.edges = tuple(edges)
+        self.counts = [0] * (len(self.edges) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.edges, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def export(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "edges": list(self.edges),
+            "counts": list(self.counts),
+        }
+
+
+class ProtocolMetrics:
+    """
+    Communication-overhead counters for one episode: messages and encoded bytes per kind
+    and per sender, mailbox depth and assist backlog per tick, time-to-ack and time-to-sync.
+    The Protocol only calls into this when it was given an instance.
+    """
+
+    def __init__(self):
+        self.sent = Counter()        # kind -> messages
+        self.bytes = Counter()       # kind -> bytes if packed with Message.pack
+        self.sent_by_agent = {}      # agent -> Counter(kind -> messages)
+        self.dropped = Counter()     # kind -> messages the transport rejected
+        self.queue_depth = Histogram(DEPTH_EDGES)     # messages per receiver, sampled every tick
+        self.assist_backlog = Histogram(DEPTH_EDGES)  # active assist requests, sampled every tick
+        self.time_to_ack = Histogram(TIME_EDGES)
+        self.time_to_sync = Histogram(TIME_EDGES)
+        self.request_time = {}       # task_id -> time of its first open assist request
+        self.ticks = 0
+
+    def count(self, kind, sender):
+        name = MsgKind(kind).name.lower()
+        self.sent[name] += 1
+        self.bytes[name] += encoded_size(sender)
+        self.sent_by_agent.setdefault(sender, Counter())[name] += 1
+
+    def on_drop(self, kind):
+        self.dropped[MsgKind(kind).name.lower()] += 1
+
+    def on_tick(self, depths, backlog):
+        self.ticks += 1
+        for depth in depths:
+            if depth is not None:  # transports that cannot observe their queues report None
+                self.queue_depth.add(depth)
+        self.assist_backlog.add(backlog)
+
+    def on_request(self, task_id, sender, now):
+        self.count(MsgKind.REQUEST_ASSIST, sender)
+        self.request_time.setdefault(task_id, now)
+
+    def on_ack(self, task_id, agent_name, now):
+        self.count(MsgKind.ACK_ASSIST, agent_name)
+        if task_id in self.request_time:
+            self.time_to_ack.add(now - self.request_time[task_id])
+
+    def on_sync(self, task_id, agent_names, now):
+        for name in agent_names:
+            self.count(MsgKind.SYNC_START, name)
+        if task_id in self.request_time:
+            self.time_to_sync.add(now - self.request_time.pop(task_id))
+
+    def export(self):
+        """Returns a JSON-serializable summary of the episode."""
+        return {
+            "ticks": self.ticks,
+            "messages": dict(self.sent),
+            "bytes": dict(self.bytes),
+            "total_messages": sum(self.sent.values()),
+            "total_bytes": sum(self.bytes.values()),
+            "messages_per_tick": sum(self.sent.values()) / self.ticks if self.ticks else None,
+            "dropped": dict(self.dropped),
+            "by_agent": {name: dict(c) for name, c in self.sent_by_agent.items()},
+            "queue_depth": self.queue_depth.export(),
+            "assist_backlog": self.assist_backlog.export(),
+            "time_to_ack": self.time_to_ack.export(),
+            "time_to_sync": self.time_to_sync.export(),
+        }
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.export(), f, indent=2)
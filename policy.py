@@ -1,53 +1,54 @@
 # policy.py
 import numpy as np
-import pybullet as p
 import random
-from strategy.dp_wrapper import DiffusionPolicyWrapper
+from event_log import EVENTS
+from world_state import WorldState
 
 class BasePolicy:
-    def choose(self, agent, task_pool):
+    def choose(self, agent, task_pool, state=None):
         raise NotImplementedError("Subclasses must implement choose() method")
 
 class NearestTaskPolicy:
+    # Pools at least this large go through the spatial grid instead of a full distance-row scan
+    GRID_MIN_POOL = 256
+
     def __init__(self):
         pass
 
-    def choose(self, agent, task_pool):
+    def choose(self, agent, task_pool, state=None):
         """
-        Choose the nearest task based on Euclidean distance.
+        Choose the nearest task based on Euclidean distance. Without a state, a snapshot of
+        the agent and the pool is captured from the agent's backend.
         """
         if not task_pool:
             return None
-        agent_pos, _ = p.getBasePositionAndOrientation(agent.id)
-        distances = {
-            obj_id: np.linalg.norm(
-                np.array(p.getBasePositionAndOrientation(obj_id)[0]) - np.array(agent_pos)
-            ) for obj_id in task_pool
-        }
-        return min(distances, key=distances.get)
-
-    def predict_action(self, agent):
+        if state is None:
+            state = WorldState(agent.backend, [agent.id], task_pool).capture()
+        if len(task_pool) >= self.GRID_MIN_POOL:
+            nearest = state.nearest_tasks(agent.id, 1, candidates=task_pool)
+            return nearest[0] if nearest else None
+        return state.distances.nearest(agent.id, task_pool)
+
+    def predict_action(self, agent, state):
         """
         Generate a simple linear movement towards the target.
         Args:
             agent: an Agent instance with .id and .task
+            state: WorldState snapshot of the current tick
         Returns:
             actions: np.ndarray of shape (8, 2) — repeated identical direction steps
         """
         if agent.task is None:
-            print(f"[WARN] {agent.name} has no task assigned.")
+            EVENTS.warn("policy", "WARN", "%s has no task assigned.", agent.name)
             return np.zeros((8, 2))  # No task → stay still
 
         task_id = agent.get_effective_task()
         if task_id is None:
-            print(f"[ERROR] {agent.name} has no effective task!")
+            EVENTS.error("policy", "ERROR", "%s has no effective task!", agent.name)
             return np.zeros((8, 2))
 
-        agent_pos, _ = p.getBasePositionAndOrientation(agent.id)
-        task_pos, _ = p.getBasePositionAndOrientation(task_id)
-
-        agent_xy = np.array(agent_pos[:2])
-        obj_xy = np.array(task_pos[:2])
+        agent_xy = state.position(agent.id)[:2]
+        obj_xy = state.position(task_id)[:2]
         delta = obj_xy - agent_xy
         norm = np.linalg.norm(delta)
         direction = delta / norm if norm > 1e-5 else np.zeros_like(delta)
@@ -61,7 +62,7 @@ class NearestTaskPolicy:
 
 
 class DiffusionPolicyStub(BasePolicy):
-    def choose(self, agent, task_pool):
+    def choose(self, agent, task_pool, state=None):
         """
         Dummy task selection: randomly choose one from task_pool.
         """
@@ -71,9 +72,11 @@ class DiffusionPolicyStub(BasePolicy):
 
 class DiffusionPolicyWrapperAdapter(BasePolicy):
     def __init__(self, ckpt_path):
+        # Imported lazily: torch/hydra are only needed when a DP checkpoint is loaded
+        from strategy.dp_wrapper import DiffusionPolicyWrapper
         self.model = DiffusionPolicyWrapper(ckpt_path)
 
-    def choose(self, agent, task_pool):
+    def choose(self, agent, task_pool, state=None):
         """
         Placeholder task selection — future DP-based selection logic can go here.
         """
@@ -1,42 +1,139 @@
 # protocol.py
 
-import time
+import sys
 import numpy as np
-import pybullet as p
+from assist_registry import AssistRegistry
+from claim_book import ClaimBook
+from clock import SimClock
+from event_log import EVENTS
+from messages import Message, MsgKind
+from topology import FullTopology
+from transport import make_transport
 
 class Protocol:
-    def __init__(self, agents, task_name_map, task_pool, task_type_map):
+    def __init__(self, agents, task_name_map, task_pool, task_type_map, message_ttl=3.0, clock=None, transport="inprocess", metrics=None,
+                 topology=None, gc_interval=64):
         self.agents = agents
         self.task_name_map = task_name_map
         self.task_pool = task_pool
         self.task_type_map = task_type_map
         
         self.sync_sent = set()
-        self.claims = []  # List of all task claims (agent, task, priority)
+        self.claim_book = ClaimBook(agents)  # Live task claims, re-read only for agents in dirty_claims
+        self.dirty_claims = set(agents)
         self.outcomes = {}  # Mapping from task ID to assigned agent name
         self.ack_registry = {}  # Mapping from task_id to a set of agent names that acknowledged assistance
-        self.assist_requests = []  # List of assistance request messages
-        self.msg_queue = {name: [] for name in agents}  # Simulated message queue for each agent
+        self.clock = clock if clock is not None else SimClock()  # Source of message timestamps/TTLs
+        self.message_ttl = message_ttl
+        self.assist_registry = AssistRegistry(task_type_map)  # Active assistance request messages
+        self.transport = make_transport(transport, list(agents))  # Message delivery between agents
+        self.metrics = metrics  # Optional ProtocolMetrics; None disables instrumentation
+        self.tracer = None  # Optional TraceRecorder, attached by SimEnv.start_trace
+        self.topology = topology if topology is not None else FullTopology()  # Who can hear whom
         self.sync_requires_reach = False # Check whether sync_agents require reaching same position
+        self.gc_interval = gc_interval  # Ticks between collect_garbage() passes; 0 disables them
+        self.gc_countdown = gc_interval
+
+        # === Reverse indexes, kept current through Agent.on_agent_change hooks ===
+        self.rank = {name: i for i, name in enumerate(agents)}  # agent iteration order
+        self.task_holders = {}  # task_id -> set of agent names whose task is task_id
+        self.eligible_helpers = set()  # agent names free to answer an assist request
+        self.assisting_holders = {}  # task_id -> number of its holders that are assisting
+        for agent in agents.values():
+            agent.observer = self
+            self.task_holders.setdefault(agent.task, set()).add(agent.name)
+            if agent.assisting:
+                self._count_assisting(agent.task, 1)
+            self._refresh_helper(agent)
+
+    def _is_eligible_helper(self, agent):
+        if agent.task is None and agent.assist_task_id is not None:
+            return False
+        if agent.reached_goal or agent.assisting or agent.sync_start or agent.waiting_for_sync:
+            return False
+        return self.task_type_map.get(agent.task) not in ("cooperative", "urgent")
+
+    def _refresh_helper(self, agent):
+        if self._is_eligible_helper(agent):
+            self.eligible_helpers.add(agent.name)
+        else:
+            self.eligible_helpers.discard(agent.name)
+
+    def _count_assisting(self, task, delta):
+        count = self.assisting_holders.get(task, 0) + delta
+        if count:
+            self.assisting_holders[task] = count
+        else:
+            del self.assisting_holders[task]
+
+    def on_agent_change(self, agent, field, old, new):
+        """Keeps the reverse indexes (and an attached trace) in step with an agent field change."""
+        if self.tracer:
+            self.tracer.on_agent_change(agent, field, new)
+        if field in ("backup_task", "started"):
+            return
+        if field == "priority":
+            self.dirty_claims.add(agent.name)
+            return
+        if field == "task":
+            self.dirty_claims.add(agent.name)
+            holders = self.task_holders.get(old)
+            if holders is not None:
+                holders.discard(agent.name)
+                if not holders:
+                    del self.task_holders[old]
+            self.task_holders.setdefault(new, set()).add(agent.name)
+            if agent.assisting:
+                self._count_assisting(old, -1)
+                self._count_assisting(new, 1)
+        elif field == "assisting":
+            self._count_assisting(agent.task, 1 if new else -1)
+        self._refresh_helper(agent)
+
+    def _ordered(self, names):
+        return sorted(names, key=self.rank.__getitem__)
+
+    @property
+    def claims(self):
+        """List of all live task claims (agent, task, priority), in agent order."""
+        book = self.claim_book.current
+        return [(name, *book[name]) for name in self._ordered(book)]
 
     def receive_claims(self):
-        """Collects task claims from agents."""
-        self.claims.clear()
-        for name, agent in self.agents.items():
-            if agent.task is not None:
-                self.claims.append((name, agent.task, agent.priority))
-                print(f"[CLAIM] {name} claims {self.task_name_map[agent.task]} (priority {agent.priority})")
+        """Collects task claims from agents whose task or priority changed since the last round."""
+        for name in self._ordered(self.dirty_claims):
+            agent = self.agents[name]
+            if self.claim_book.update(name, agent.task, agent.priority) and agent.task is not None:
+                EVENTS.info("protocol", "CLAIM", "%s claims %s (priority %s)", name, self.task_name_map[agent.task], agent.priority)
+                if self.metrics:
+                    self.metrics.count(MsgKind.CLAIM, name)
+                if self.tracer:
+                    self.tracer.on_message(MsgKind.CLAIM, name, agent.task)
+        self.dirty_claims.clear()
 
     def evaluate_conflicts(self):
-        """Evaluates conflicts between multiple claims and selects winners."""
-        claim_dict = {}
-        for name, task, priority in self.claims:
-            claim_dict.setdefault(task, []).append((priority, name))
-
-        for task, entries in claim_dict.items():
-            entries.sort(reverse=True)   # Higher priority number means higher priority
-            winner = entries[0][1]
-            self.outcomes[task] = winner
+        """Re-selects winners (highest priority, then name) for tasks whose claims changed."""
+        for task, winner in self.claim_book.evaluate().items():
+            self.set_outcome(task, winner)  # None: nobody claims the task any more
+
+    def set_outcome(self, task, winner):
+        """Records the winner of a task (None drops its outcome), counting and tracing the RESPOND it sends."""
+        if winner is None:
+            self.outcomes.pop(task, None)
+            if self.tracer:
+                self.tracer.on_outcome(task, None)
+            return
+        self.outcomes[task] = winner
+        if self.metrics:
+            self.metrics.count(MsgKind.RESPOND, winner)
+        if self.tracer:
+            self.tracer.on_message(MsgKind.RESPOND, winner, task)
+            self.tracer.on_outcome(task, winner)
+
+    def clear_outcomes(self):
+        """Drops every outcome through set_outcome."""
+        for task in list(self.outcomes):
+            self.set_outcome(task, None)
 
     def resolve_outcomes(self):
         """Finalizes the outcomes of task assignments."""
@@ -46,99 +143,184 @@ class Protocol:
                 continue
             agent = self.agents[winner]
             if agent.task == task:
-                print(f"[ACCEPTED] {winner}'s claim for {self.task_name_map[task]}")
+                EVENTS.info("protocol", "ACCEPTED", "%s's claim for %s", winner, self.task_name_map[task])
                 task_assigned.add(task)
             else:
-                print(f"[REJECTED] {winner}'s claim for {self.task_name_map[task]}")
+                EVENTS.info("protocol", "REJECTED", "%s's claim for %s", winner, self.task_name_map[task])
 
         return len(task_assigned) == len(self.agents)
 
+    def create_message(self, kind, sender, task_id=None, priority=0, urgency=0, ttl=None):
+        """Creates a Message stamped with the protocol clock."""
+        return Message(kind, sender, task_id, priority, urgency,
+                       self.clock.time(), self.message_ttl if ttl is None else ttl)
+
     def send(self, receiver_name, msg):
-        """Sends a message to a specified agent."""
-        if receiver_name in self.msg_queue:
-            self.msg_queue[receiver_name].append((time.time(), msg))
+        """
+        Sends a message to a specified agent in range of the sender; it expires after msg.ttl.
+        Only messages the transport accepted are counted and traced.
+        """
+        if receiver_name in self.agents and self.topology.can_reach(msg.sender, receiver_name):
+            if not self.transport.send(receiver_name, msg):
+                if self.metrics:
+                    self.metrics.on_drop(msg.kind)
+                return False
+            if self.metrics:
+                self.metrics.count(msg.kind, msg.sender)
+            if self.tracer:
+                self.tracer.on_message(msg.kind, msg.sender, msg.task_id, receiver_name)
+            return True
+        return False
 
     def recv(self, receiver_name):
-        """Retrieves all messages for a given agent."""
-        return [msg for ts, msg in self.msg_queue.get(receiver_name, [])]
-
-    def cleanup_expired_messages(self, ttl=3.0):
-        """Cleans up expired messages based on a time-to-live (TTL)."""
-        now = time.time()
-        for name in self.msg_queue:
-            self.msg_queue[name] = [
-                (ts, msg) for ts, msg in self.msg_queue[name] if now - ts <= ttl
-            ]
-        self.assist_requests = [
-            r for r in self.assist_requests if now - r.get("timestamp", now) <= r.get("ttl", ttl)
+        """Retrieves and consumes all pending messages for a given agent."""
+        return self.transport.recv(receiver_name, self.clock.time())
+
+    def add_assist_request(self, msg):
+        """Publishes an assistance request until its TTL runs out."""
+        self.assist_registry.add(msg)
+        if self.metrics:
+            self.metrics.on_request(msg.task_id, msg.sender, msg.timestamp)
+        if self.tracer:
+            self.tracer.on_message(MsgKind.REQUEST_ASSIST, msg.sender, msg.task_id)
+
+    def cleanup_expired_messages(self):
+        """Drops messages and assist requests whose time-to-live (TTL) has passed."""
+        now = self.clock.time()
+        self.transport.expire(now)
+        self.assist_registry.expire(now)
+        if self.metrics:
+            self.metrics.on_tick((self.transport.pending(name) for name in self.agents), len(self.assist_registry))
+        if self.gc_interval:
+            self.gc_countdown -= 1
+            if self.gc_countdown <= 0:
+                self.collect_garbage()
+
+    def collect_garbage(self):
+        """Retires the per-task state of completed or abandoned tasks; returns how many entries were dropped."""
+        self.gc_countdown = self.gc_interval
+        open_requests = self.assist_registry.by_task
+        backups = {a.backup_task for a in self.agents.values() if a.backup_task is not None}
+
+        def finished(task):
+            # Nobody holds the task unfinished or will resume it, so no new request can name it
+            return task not in backups and all(self.agents[n].reached_goal for n in self.task_holders.get(task, ()))
+
+        done_syncs = [t for t in self.sync_sent if t not in open_requests and finished(t)]
+        self.sync_sent.difference_update(done_syncs)
+
+        # Acks for a sync that never started, once every helper has moved on
+        stale_acks = [
+            t for t, names in self.ack_registry.items()
+            if t not in open_requests and all(self.agents[n].task != t for n in names)
+        ]
+        for task in stale_acks:
+            del self.ack_registry[task]
+
+        # Outcomes whose winner neither holds the task nor will resume it
+        dead_outcomes = [
+            t for t, winner in self.outcomes.items()
+            if self.agents[winner].task != t and self.agents[winner].backup_task != t
         ]
+        for task in dead_outcomes:
+            self.set_outcome(task, None)
+
+        if self.metrics:
+            for task in [t for t in self.metrics.request_time if t not in open_requests and t not in self.ack_registry]:
+                del self.metrics.request_time[task]
+        return len(done_syncs) + len(stale_acks) + len(dead_outcomes)
+
+    def memory_usage(self):
+        """Entry counts of the per-task protocol state plus an approximate total size in bytes."""
+        book = self.claim_book
+        containers = {
+            "sync_sent": self.sync_sent,
+            "ack_registry": self.ack_registry,
+            "outcomes": self.outcomes,
+            "assist_requests": self.assist_registry.requests,
+            "claims": book.current,
+            "claim_heaps": book.heaps,
+            "task_holders": self.task_holders,
+        }
+        report = {name: len(c) for name, c in containers.items()}
+        nbytes = sum(sys.getsizeof(c) for c in containers.values())
+        nbytes += sum(sys.getsizeof(v) for v in self.ack_registry.values())
+        nbytes += sum(sys.getsizeof(v) for v in book.heaps.values())
+        nbytes += sum(sys.getsizeof(v) for v in self.task_holders.values())
+        nbytes += len(self.assist_registry) * sys.getsizeof(Message(MsgKind.REQUEST_ASSIST, ""))
+        report["claim_heap_entries"] = sum(len(v) for v in book.heaps.values())
+        report["bytes"] = nbytes
+        return report
+
+    @property
+    def assist_requests(self):
+        """
+        Read-only tuple of the active assist requests, oldest first; publish new ones
+        with add_assist_request.
+        """
+        return tuple(self.assist_registry.requests.values())
 
     def get_pending_assist_requests(self):
         """Returns active cooperative task assist requests."""
-        return [
-            r for r in self.assist_requests
-            if self.task_type_map.get(r["task_id"]) == "cooperative"
-        ]
+        return self.assist_registry.pending_cooperative()
 
     def get_task_priority(self, task_id):
         """Returns the current priority of the task based on agent claims."""
-        for agent in self.agents.values():
-            if agent.task == task_id:
-                return agent.priority
-        return 999
-
-    def create_request_assist(self, sender, task_id, urgency=1, ttl=3.0):
-        """Creates an assistance request message."""
-        return {
-            "type": "request_assist",
-            "sender": sender,
-            "task_id": task_id,
-            "urgency": urgency,
-            "timestamp": time.time(),
-            "ttl": ttl
-        }
+        holders = self.task_holders.get(task_id)
+        if not holders:
+            return 999
+        return self.agents[min(holders, key=self.rank.__getitem__)].priority
+
+    def create_request_assist(self, sender, task_id, urgency=1, ttl=None):
+        """Creates an assistance request message; it expires after ttl (default: message_ttl)."""
+        return self.create_message(MsgKind.REQUEST_ASSIST, sender, task_id, urgency=urgency, ttl=ttl)
 
     def record_ack_assist(self, task_id, agent_name):
         """Records an agent's agreement to assist with a task."""
         self.ack_registry.setdefault(task_id, set()).add(agent_name)
+        if self.metrics:
+            self.metrics.on_ack(task_id, agent_name, self.clock.time())
+        if self.tracer:
+            self.tracer.on_message(MsgKind.ACK_ASSIST, agent_name, task_id)
 
     def get_assist_request_sender(self, task_id):
         """Returns the sender of the assist request for a given task."""
-        for r in self.assist_requests:
-            if r["task_id"] == task_id:
-                return r["sender"]
-        return None
+        return self.assist_registry.sender_of(task_id)
+
+    def has_assist_request(self, sender, task_id):
+        """Checks whether an agent already has an active assist request out for a task."""
+        return self.assist_registry.has_request(sender, task_id)
 
     def get_assist_group(self, task_id):
         """Returns a list of agent names who are ready to synchronize on the task."""
         return [
-            a.name for a in self.agents.values()
-            if a.task == task_id and (a.waiting_for_sync or a.sync_start)
+            name for name in self._ordered(self.task_holders.get(task_id, ()))
+            if self.agents[name].waiting_for_sync or self.agents[name].sync_start
         ]
     def get_assisted_tasks(self):
-        """Returns a set of task_ids that currently have active assist requests."""
-        return {r["task_id"] for r in self.assist_requests if self.task_type_map.get(r["task_id"]) == "cooperative"}
+        """Returns the (live, read-only) set of cooperative task_ids that currently have active assist requests."""
+        return self.assist_registry.cooperative
 
     def is_ready_for_sync(self, task_id):
         """Checks whether a task has enough agents ready to start execution."""
         group = self.get_assist_group(task_id)
         return len(group) >= 2 and all(self.agents[name].reached_goal for name in group)
     
-    def get_agent_obs(self, agent, task_obj_id):
+    def get_agent_obs(self, agent, task_obj_id, state):
         """Returns a low-dimensional observation vector for the agent and its target task."""
         if task_obj_id is None:
-            print(f"[ERROR] get_agent_obs called with None task for {agent.name}")
+            EVENTS.error("protocol", "ERROR", "get_agent_obs called with None task for %s", agent.name)
             return np.zeros(2)  # or return None
-        agent_pos, _ = p.getBasePositionAndOrientation(agent.id)
-        agent_vel, _ = p.getBaseVelocity(agent.id)
-        obj_pos, _ = p.getBasePositionAndOrientation(task_obj_id)
-        obj_vel, _ = p.getBaseVelocity(task_obj_id)
+        agent_pos = state.position(agent.id)
+        agent_vel = state.velocity(agent.id)
+        obj_pos = state.position(task_obj_id)
+        obj_vel = state.velocity(task_obj_id)
 
         agent_cos, agent_sin = 1.0, 0.0  # Placeholder for orientation
         task_name = agent.task_name_map[task_obj_id]
         obj_idx = int(task_name.split("_")[1])
         one_hot = np.zeros(8)
-        one_hot[obj_idx] = 1.0
+        one_hot[obj_idx % len(one_hot)] = 1.0  # obs stays 20-dim for scenes with more than 8 objects
 
         obs = np.concatenate([
             agent_pos[:2], agent_vel[:2],
@@ -154,29 +336,20 @@ class Protocol:
             self.sync_sent = set()
 
         for msg in self.get_pending_assist_requests():
-            task_id = msg["task_id"]
-            sender = msg["sender"]
+            task_id = msg.task_id
+            sender = msg.sender
 
             # Already enough helpers?
-            helpers = [
-                a for a in self.agents.values()
-                if a.task == task_id and a.assisting
-            ]
-            if len(helpers) >= 2:
+            if self.assisting_holders.get(task_id, 0) >= 2:
                 continue
 
             if task_id in self.sync_sent:
                 continue  # Already sync-started
 
-            for agent in self.agents.values():
-                if agent.name == sender:
-                    continue
-                if agent.task is None and agent.assist_task_id is not None:
-                    continue  
-                if agent.reached_goal or agent.assisting or agent.sync_start or agent.waiting_for_sync:
+            for name in self._ordered(self.topology.reachable(sender, self.eligible_helpers)):
+                if name == sender:
                     continue
-                if self.task_type_map.get(agent.task) in ["cooperative", "urgent"]:
-                    continue  
+                agent = self.agents[name]
 
                 # Priority check
                 sender_prio = self.get_task_priority(task_id)
@@ -184,7 +357,7 @@ class Protocol:
                 if my_prio < sender_prio:
                     continue
 
-                print(f"[ASSIST] {agent.name} assists {sender} on {self.task_name_map[task_id]}")
+                EVENTS.info("protocol", "ASSIST", "%s assists %s on %s", agent.name, sender, self.task_name_map[task_id])
                 agent.backup_task = agent.task  
                 agent.task = task_id           
                 agent.assist_task_id = task_id
@@ -197,6 +370,7 @@ class Protocol:
                 self.record_ack_assist(task_id, agent.name)
 
         # === check if we can sync-start===
+        synced = []
         for task_id, agents_ready in self.ack_registry.items():
             if task_id in self.sync_sent:
                 continue
@@ -217,5 +391,14 @@ class Protocol:
                 self.agents[name].sync_start = True
                 self.agents[name].waiting_for_sync = False
             self.sync_sent.add(task_id)
-            print(f"[SYNC-START] Task {self.task_name_map[task_id]}: {[name for name in agents_ready]}")
-
+            synced.append(task_id)
+            if self.metrics:
+                self.metrics.on_sync(task_id, agents_ready, self.clock.time())
+            if self.tracer:
+                for name in sorted(agents_ready):
+                    self.tracer.on_message(MsgKind.SYNC_START, name, task_id)
+            EVENTS.info("protocol", "SYNC-START", "Task %s: %s", self.task_name_map[task_id], list(agents_ready))
+
+        # Acks are only read until the sync starts; sync_sent keeps the task from being re-helped
+        for task_id in synced:
+            del self.ack_registry[task_id]
@@ -0,0 +1,306 @@
+# replay.py
+
+import argparse
+from collections import Counter
+
+import numpy as np
+
+from clock import SimClock
+from event_log import EVENTS, LEVELS
+from sim_env import SimEnv
+from tracing import AGENT_COLUMNS, FLAG_BITS, FLAG_ROW, NONE_ID, TraceReader, TraceTap, flag_names, restore_agent
+
+
+class ReplayScene:
+    """SceneConfig stand-in that reproduces the recorded agents and task types."""
+    agent_layout = None
+
+    def __init__(self, header):
+        self.header = header
+
+    def agent_names(self):
+        return list(self.header["agents"])
+
+    def agent_weight_map(self):
+        return {}
+
+    def agent_positions(self):
+        return [(0.0, 0.0, 0.0)] * len(self.header["agents"])
+
+    def object_positions(self):
+        return [(0.0, 0.0, 0.0)] * len(self.header["task_ids"])
+
+    def task_types(self):
+        return list(self.header["task_types"])
+
+
+class ReplayBackend:
+    """Physics-free backend that serves the poses recorded at the start of tick `cursor`."""
+    name = "replay"
+
+    def __init__(self, reader):
+        self.reader = reader
+        self.client = None
+        self.time_step = reader.header["tick_duration"]
+        self.sim_time = 0.0
+        self.cursor = 0
+
+    def load_plane(self):
+        return NONE_ID
+
+    def load_objects(self, positions):
+        return list(self.reader.header["task_ids"])
+
+    def load_agents(self, positions, orn=None):
+        return list(self.reader.header["agent_ids"])
+
+    def get_position(self, uid):
+        return self.reader["positions"][self.cursor][self.reader.header["body_ids"].index(uid)].copy()
+
+    def reset_position(self, uid, pos, orn=None):
+        pass  # Agents teleport into the snapshot; the next tick reads the recorded pose instead
+
+    def save_state(self):
+        return None
+
+    def restore_state(self, saved):
+        self.sim_time = 0.0
+
+    def capture(self, state):
+        i = self.cursor
+        state.positions[:] = self.reader["positions"][i]
+        state.orientations[:] = self.reader["orientations"][i]
+        if len(self.reader["linear_velocities"]):
+            state.linear_velocities[:] = self.reader["linear_velocities"][i]
+
+    def step(self):
+        self.sim_time += self.time_step
+
+    def close(self):
+        pass
+
+
+class ReplayEnv(SimEnv):
+    """
+    SimEnv over a ReplayBackend: the regular pre_tick / agent update / post_tick sequence,
+    with world poses and the protocol clock taken from the recording at every tick.
+    Each episode starts from the decision state stored in the trace header.
+    """
+
+    def __init__(self, reader):
+        self.reader = reader
+        header = reader.header
+        super().__init__(len(header["agents"]), len(header["task_ids"]), backend=ReplayBackend(reader),
+                         clock=SimClock(header["start_time"]), comm_radius=header["comm_radius"],
+                         scene=ReplayScene(header))
+
+    def _build_scene(self):
+        super()._build_scene()
+        self.task_name_map.update(zip(self.object_ids, self.reader.header["task_names"]))
+
+    def _init_episode(self):
+        super()._init_episode()
+        header = self.reader.header
+        self.protocol.message_ttl = header["message_ttl"]
+        self.protocol.sync_requires_reach = header["sync_requires_reach"]
+        for agent, snapshot in zip(self.agents.values(), header["initial_agents"]):
+            restore_agent(agent, snapshot)
+        names = header["agents"]
+        self.protocol.outcomes.update((task, names[w]) for task, w in header["initial_outcomes"])
+        # Same claim book the recording had once task assignment settled
+        for name, agent in self.agents.items():
+            self.protocol.claim_book.update(name, agent.task, agent.priority)
+        self.protocol.claim_book.evaluate()
+        self.protocol.dirty_claims.clear()
+
+    def pre_tick(self):
+        i = self.backend.cursor
+        self.clock.now = float(self.reader["time"][i])
+        self.state.tick = int(self.reader["tick"][i]) - 1  # capture() advances it to the recorded tick
+        return super().pre_tick()
+
+
+class Divergence:
+    """One difference between the replayed and the recorded run at a tick."""
+    __slots__ = ("tick", "kind", "subject", "recorded", "replayed")
+
+    def __init__(self, tick, kind, subject, recorded, replayed):
+        self.tick = tick
+        self.kind = kind          # "field", "message", "outcome" or "pose"
+        self.subject = subject    # e.g. "agent3.task", a task id, or None for the tick's message stream
+        self.recorded = recorded
+        self.replayed = replayed
+
+    def __repr__(self):
+        return f"tick {self.tick} {self.kind} {self.subject}: recorded={self.recorded} replayed={self.replayed}"
+
+
+class Replay:
+    """
+    Re-runs the Protocol and Agent decision logic of a recorded episode against its recorded
+    trajectories, without physics, and reports where the decisions diverge: agent fields at the
+    end of a tick, the tick's message stream, outcomes, and the positions agents commanded.
+    Poses at the start of every tick always come from the recording. With resync=True the
+    recorded agent fields and outcomes are restored after every tick, so each divergence is
+    reported where it starts instead of cascading. Exact for traces started right after task
+    assignment, as main.py --trace does.
+    """
+
+    def __init__(self, trace, resync=False, pose_tol=1e-9):
+        self.reader = trace if isinstance(trace, TraceReader) else TraceReader(trace)
+        self.resync = resync
+        self.pose_tol = pose_tol
+        self.env = ReplayEnv(self.reader)
+        self.divergences = []
+        self._restart(fresh=True)
+
+    def _restart(self, fresh=False):
+        if not fresh:
+            self.env._init_episode()
+        self.tap = TraceTap(self.env.agents.values())
+        self.env.protocol.tracer = self.tap
+        self.names = self.reader.agents
+        self.recorded_outcomes = {task: self.names[w] for task, w in self.reader.header["initial_outcomes"]}
+        self.cursor = 0
+        self.divergences = []
+
+    def __len__(self):
+        return len(self.reader)
+
+    @property
+    def tick(self):
+        """Recorded tick number the next step() replays (None once the trace is exhausted)."""
+        return int(self.reader["tick"][self.cursor]) if self.cursor < len(self.reader) else None
+
+    def seek(self, tick):
+        """Replays up to (not including) the recorded tick, restarting from the beginning when seeking back."""
+        ticks = self.reader["tick"]
+        target = int(np.searchsorted(ticks, tick))
+        if target < self.cursor:
+            self._restart()
+        while self.cursor < target:
+            self.step()
+        return self
+
+    def step(self):
+        """Replays the next recorded tick; returns its divergences."""
+        i = self.cursor
+        tick = int(self.reader["tick"][i])
+        self.env.backend.cursor = i
+        self.tap.tick = tick
+        self.tap.messages.clear()
+        self.env.step()
+
+        for task, winner in self.reader.outcome_changes_at(tick):
+            if winner is None:
+                self.recorded_outcomes.pop(task, None)
+            else:
+                self.recorded_outcomes[task] = winner
+        found = self._compare(i, tick)
+        if self.resync and found:
+            self._resync(i)
+        self.divergences.extend(found)
+        self.cursor += 1
+        return found
+
+    def run(self, until=None):
+        """Replays the remaining ticks (up to the recorded tick `until`); returns the report."""
+        stop = len(self.reader) if until is None else int(np.searchsorted(self.reader["tick"], until))
+        while self.cursor < stop:
+            self.step()
+        return self.report()
+
+    # === Comparison ===
+    def _compare(self, i, tick):
+        found = []
+        reader = self.reader
+
+        # Agent fields at the end of the tick
+        recorded = np.stack([reader[name][i] for name in AGENT_COLUMNS])
+        for row, a in np.argwhere(self.tap.fields != recorded):
+            rec, rep = int(recorded[row, a]), int(self.tap.fields[row, a])
+            if row == FLAG_ROW:
+                for flag in flag_names(rec ^ rep):
+                    bit = FLAG_BITS[flag]
+                    found.append(Divergence(tick, "field", f"{self.names[a]}.{flag}", bool(rec & bit), bool(rep & bit)))
+            else:
+                found.append(Divergence(tick, "field", f"{self.names[a]}.{AGENT_COLUMNS[row]}",
+                                        None if rec == NONE_ID else rec, None if rep == NONE_ID else rep))
+
+        # Message stream: same messages in the same order
+        recorded = reader.message_rows(tick)
+        replayed = [m[1:] for m in self.tap.messages]
+        if recorded != replayed:
+            missing = list((Counter(recorded) - Counter(replayed)).elements())
+            extra = list((Counter(replayed) - Counter(recorded)).elements())
+            if not missing and not extra:
+                missing, extra = recorded, replayed  # Same messages, different order
+            found.append(Divergence(tick, "message", None, [reader.decode_message(m) for m in missing],
+                                    [reader.decode_message(m) for m in extra]))
+
+        # Outcomes after the tick
+        outcomes = self.env.protocol.outcomes
+        if outcomes != self.recorded_outcomes:
+            for task in sorted(outcomes.keys() | self.recorded_outcomes.keys()):
+                rec, rep = self.recorded_outcomes.get(task), outcomes.get(task)
+                if rec != rep:
+                    found.append(Divergence(tick, "outcome", task, rec, rep))
+
+        # Agent moves commanded during the tick
+        commanded = self.env.state.positions[:self.tap.num_agents]
+        recorded = reader["commanded"][i]
+        for k in np.flatnonzero(np.abs(commanded - recorded).max(axis=1) > self.pose_tol):
+            found.append(Divergence(tick, "pose", self.names[k], recorded[k].tolist(), commanded[k].tolist()))
+        return found
+
+    def _resync(self, i):
+        """Puts the recorded agent fields and outcomes back so the next tick starts from the recording."""
+        recorded = np.stack([self.reader[name][i] for name in AGENT_COLUMNS])
+        for a in np.flatnonzero((self.tap.fields != recorded).any(axis=0)):
+            restore_agent(self.tap.agents[a], recorded[:, a])
+        outcomes = self.env.protocol.outcomes
+        outcomes.clear()
+        outcomes.update(self.recorded_outcomes)
+
+    def report(self):
+        """Summary of the divergences found so far."""
+        first = self.divergences[0] if self.divergences else None
+        return {
+            "ticks": self.cursor,
+            "recorded_ticks": len(self.reader),
+            "divergences": len(self.divergences),
+            "diverged_ticks": len({d.tick for d in self.divergences}),
+            "by_kind": dict(Counter(d.kind for d in self.divergences)),
+            "first_tick": first.tick if first else None,
+            "first": [repr(d) for d in self.divergences if first and d.tick == first.tick],
+        }
+
+    def close(self):
+        self.env.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded traces through the current protocol logic")
+    parser.add_argument("traces", nargs="+", metavar="TRACE", help="trace files written with main.py --trace")
+    parser.add_argument("--seek", type=int, default=None, help="fast-forward to this recorded tick first; divergences on the way are still reported")
+    parser.add_argument("--until", type=int, default=None, help="stop before this recorded tick")
+    parser.add_argument("--resync", action="store_true", help="restore the recorded state after each divergent tick")
+    parser.add_argument("--log-level", choices=list(LEVELS), default="off", help="minimum level of echoed replay events")
+    args = parser.parse_args()
+    EVENTS.configure(level=args.log_level)
+
+    diverged = 0
+    for path in args.traces:
+        replay = Replay(path, resync=args.resync)
+        if args.seek is not None:
+            replay.seek(args.seek)
+        report = replay.run(args.until)
+        replay.close()
+        status = "same" if report["divergences"] == 0 else f"DIVERGED at tick {report['first_tick']}"
+        print(f"[REPLAY] {path}: {report['ticks']}/{report['recorded_ticks']} ticks, {status}, "
+              f"{report['divergences']} divergences {report['by_kind']}")
+        for line in report["first"]:
+            print(f"  {line}")
+        diverged += report["divergences"] > 0
+    EVENTS.close()
+    raise SystemExit(1 if diverged else 0)
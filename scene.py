@@ -0,0 +1,143 @@
+# scene.py
+
+import math
+import numpy as np
+
+TASK_TYPES = ("cooperative", "urgent", "solo")
+
+# The original three-agent scene
+LEGACY_AGENT_STARTS = [[0, -1, 0.5], [0, 1, 0.5], [-1, 0, 0.5]]
+LEGACY_AGENT_WEIGHTS = [0, 2, 5]
+
+# An r2d2 is about 0.54 x 0.72 m across; agent starts are at least this far apart
+AGENT_SPACING = 0.8
+MAX_PLACEMENT_TRIES = 1000
+
+AGENT_LAYOUTS = ("legacy", "line", "grid", "circle", "random")
+OBJECT_LAYOUTS = ("random", "grid", "clustered")
+
+def grid_positions(n, half_extent, height, min_spacing=0.0):
+    """
+    Returns n points on a centered square grid covering [-half_extent, half_extent]^2;
+    the grid grows beyond half_extent when that is needed to keep min_spacing between points.
+    """
+    if n == 0:
+        return np.zeros((0, 3))
+    cols = math.ceil(math.sqrt(n))
+    spacing = max(2 * half_extent / cols, min_spacing)
+    half_extent = spacing * cols / 2
+    idx = np.arange(n)
+    xy = np.stack([idx % cols, idx // cols], axis=1) * spacing - half_extent + spacing / 2
+    return np.column_stack([xy, np.full(n, height)])
+
+def separated_positions(n, half_extent, height, min_spacing):
+    """
+    Samples n uniform points in [-h, h]^2, h = max(half_extent, min_spacing * sqrt(n)), re-drawing
+    any point closer than min_spacing to an earlier one. Raises ValueError if a point cannot be placed.
+    """
+    h = max(half_extent, min_spacing * math.sqrt(n))
+    xy = np.random.uniform(-h, h, size=(n, 2))
+    for i in range(1, n):
+        for _ in range(MAX_PLACEMENT_TRIES):
+            if np.min(np.linalg.norm(xy[:i] - xy[i], axis=1)) >= min_spacing:
+                break
+            xy[i] = np.random.uniform(-h, h, size=2)
+        else:
+            raise ValueError(f"Could not place {n} agents {min_spacing} m apart in [-{h:.1f}, {h:.1f}]^2")
+    return np.column_stack([xy, np.full(n, height)])
+
+def interleave_types(counts):
+    """Spreads task types evenly along the object list, e.g. {'solo': 2, 'urgent': 1} → solo, urgent, solo."""
+    keyed = []
+    for order, (task_type, count) in enumerate(counts.items()):
+        keyed.extend(((k + 0.5) / count, order, task_type) for k in range(count))
+    keyed.sort()
+    return [task_type for _, _, task_type in keyed]
+
+
+class SceneConfig:
+    """Parametric description of a scene: body counts, start layouts and the task-type mix."""
+
+    def __init__(self, num_agents=3, num_objects=3, agent_layout=None, object_layout="random",
+                 task_type_mix=None, agent_weights=None, arena_size=2.0, height=0.5, num_clusters=4):
+        if agent_layout is None:
+            agent_layout = "legacy" if num_agents <= len(LEGACY_AGENT_STARTS) else "grid"
+        if agent_layout not in AGENT_LAYOUTS:
+            raise ValueError(f"Unknown agent_layout '{agent_layout}', expected one of {AGENT_LAYOUTS}")
+        if agent_layout == "legacy" and num_agents > len(LEGACY_AGENT_STARTS):
+            raise ValueError(f"The legacy layout only has {len(LEGACY_AGENT_STARTS)} agent starts")
+        if object_layout not in OBJECT_LAYOUTS:
+            raise ValueError(f"Unknown object_layout '{object_layout}', expected one of {OBJECT_LAYOUTS}")
+
+        self.num_agents = num_agents
+        self.num_objects = num_objects
+        self.agent_layout = agent_layout
+        self.object_layout = object_layout
+        self.task_type_mix = task_type_mix
+        self.agent_weights = agent_weights
+        self.arena_size = arena_size  # objects spawn in [-arena_size, arena_size]^2
+        self.height = height
+        self.num_clusters = num_clusters
+
+    def agent_names(self):
+        return [f"agent{i + 1}" for i in range(self.num_agents)]
+
+    def agent_weight_map(self):
+        """Fixed per-agent priority weights; agents beyond the legacy three default to 0."""
+        weights = self.agent_weights
+        if weights is None:
+            weights = LEGACY_AGENT_WEIGHTS
+        names = self.agent_names()
+        return {name: (weights[i] if i < len(weights) else 0) for i, name in enumerate(names)}
+
+    def agent_positions(self):
+        """
+        Returns an (num_agents, 3) array of start positions. Layouts keep agents at least
+        AGENT_SPACING apart and grow beyond arena_size when N needs more room.
+        """
+        n, h, d = self.num_agents, self.height, AGENT_SPACING
+        if self.agent_layout == "legacy":
+            return np.array(LEGACY_AGENT_STARTS[:n], dtype=float)
+        if self.agent_layout == "line":
+            spacing = max(2 * self.arena_size / (n - 1), d) if n > 1 else 0.0
+            xs = (np.arange(n) - (n - 1) / 2) * spacing
+            return np.column_stack([xs, np.full(n, -self.arena_size / 2), np.full(n, h)])
+        if self.agent_layout == "grid":
+            return grid_positions(n, self.arena_size / 2, h, min_spacing=d)
+        if self.agent_layout == "circle":
+            angles = 2 * np.pi * np.arange(n) / max(n, 1)
+            radius = 0.5 * self.arena_size
+            if n > 1:
+                radius = max(radius, d / (2 * math.sin(math.pi / n)))  # neighbour chord >= d
+            return np.column_stack([radius * np.cos(angles), radius * np.sin(angles), np.full(n, h)])
+        return separated_positions(n, self.arena_size, h, d)
+
+    def object_positions(self):
+        """Samples an (num_objects, 3) array of task object positions."""
+        m, a, h = self.num_objects, self.arena_size, self.height
+        if self.object_layout == "grid":
+            return grid_positions(m, a, h)
+        if self.object_layout == "clustered":
+            centers = np.random.uniform(low=[-a, -a], high=[a, a], size=(self.num_clusters, 2))
+            xy = centers[np.random.randint(self.num_clusters, size=m)] + np.random.normal(0, 0.1 * a, size=(m, 2))
+            return np.column_stack([np.clip(xy, -a, a), np.full(m, h)])
+        # Same draw order as sampling one object at a time
+        return np.random.uniform(low=[-a, -a, h], high=[a, a, h], size=(m, 3))
+
+    def task_types(self):
+        """Returns one task type per object, following task_type_mix (type → share or count)."""
+        m = self.num_objects
+        if self.task_type_mix is None:
+            return [TASK_TYPES[i % len(TASK_TYPES)] for i in range(m)]
+
+        mix = {t: float(w) for t, w in self.task_type_mix.items() if w > 0}
+        if not mix:
+            raise ValueError("task_type_mix needs at least one positive entry")
+        total = sum(mix.values())
+        # Largest-remainder rounding so the counts add up to num_objects exactly
+        exact = {t: m * w / total for t, w in mix.items()}
+        counts = {t: int(v) for t, v in exact.items()}
+        leftover = m - sum(counts.values())
+        for t in sorted(exact, key=lambda t: exact[t] - counts[t], reverse=True)[:leftover]:
+            counts[t] += 1
+        return interleave_types({t: c for t, c in counts.items() if c > 0})
@@ -1,103 +1,202 @@
-import pybullet as p
-import pybullet_data
+import random
 import numpy as np
 
 from agent import Agent
+from agent_table import AgentTable
+from assignment import AssignmentEngine
+from backends import make_backend
+from clock import SimClock
+from event_log import EVENTS
+from metrics import ProtocolMetrics
 from protocol import Protocol
 from policy import NearestTaskPolicy  # You can swap in DiffusionPolicy later
+from scene import SceneConfig
 from task_conflict_gen import assign_conflicting_tasks
+from topology import make_topology
+from tracing import TraceRecorder
+from world_state import WorldState
 
 class SimEnv:
-    def __init__(self, num_agents=3, num_objects=3):
+    def __init__(self, num_agents=3, num_objects=3, backend="pybullet", frame_skip=1, clock=None, transport="inprocess",
+                 metrics=False, comm_radius=None, scene=None, **scene_kwargs):
+        # scene_kwargs go to SceneConfig: agent_layout, object_layout, task_type_mix, agent_weights, ...
+        self.scene = scene if scene is not None else SceneConfig(num_agents, num_objects, **scene_kwargs)
         self.num_agents = num_agents
         self.num_objects = num_objects
+        self.frame_skip = frame_skip  # physics substeps per protocol/agent decision tick
+        self.clock = clock if clock is not None else SimClock()  # protocol time; a SimClock advances one tick per step
+        self.transport = transport  # protocol message transport: "inprocess", "shm", "unix" or an instance
+        self.collect_metrics = metrics  # per-episode ProtocolMetrics when True
+        self.comm_radius = comm_radius  # None: every agent hears every other agent
+        self.metrics_history = []  # exported metrics of finished episodes
+        self.protocol = None
+        self.recorder = None  # TraceRecorder while a trace is being written
 
-        # === PyBullet setup ===
-        p.connect(p.DIRECT)
-        p.setAdditionalSearchPath(pybullet_data.getDataPath())
-        p.setGravity(0, 0, -9.8)
-        p.loadURDF("plane.urdf")
+        # === Physics backend setup ===
+        self.backend = make_backend(backend)
+        self.client_id = self.backend.client
+        self._build_scene()
+
+    def _build_scene(self):
+        """Loads the plane, task objects and agents once, then snapshots the scene for fast resets."""
+        self.backend.load_plane()
 
         # === Create task objects ===
-        self.object_ids = []
-        self.task_name_map = {}
+        self.object_ids = self.backend.load_objects(self.scene.object_positions())
+        self.task_name_map = {obj_id: f"cube_{i}" for i, obj_id in enumerate(self.object_ids)}
+
+        # === Create agent bodies ===
+        agent_uids = self.backend.load_agents(self.scene.agent_positions())
+        self.agent_ids = dict(zip(self.scene.agent_names(), agent_uids))
+        self.agent_weights = self.scene.agent_weight_map()
 
-        for i in range(num_objects):
-            pos = np.random.uniform(low=[-2, -2, 0.5], high=[2, 2, 0.5])
-            obj_id = p.loadURDF("cube_small.urdf", pos)
-            self.object_ids.append(obj_id)
-            self.task_name_map[obj_id] = f"cube_{i}"
+        self.scene_state = self.backend.save_state()
+        self._init_episode()
 
+    def _init_episode(self):
+        """Creates fresh agent, protocol and snapshot objects over the existing bodies."""
         # === Assign task types ===
-        self.task_type_map = {
-            self.object_ids[0]: "cooperative",
-            self.object_ids[1]: "urgent",
-            self.object_ids[2]: "solo"
-        }
+        self.task_type_map = dict(zip(self.object_ids, self.scene.task_types()))
 
         # === Create agents ===
-        agent_starts = {
-            "agent1": [0, -1, 0.5],
-            "agent2": [0, 1, 0.5],
-            "agent3": [-1, 0, 0.5]
-        }
-        agent_orientation = p.getQuaternionFromEuler([0, 0, 0])
         policy = NearestTaskPolicy()
 
+        self.agent_table = AgentTable(capacity=len(self.agent_ids))
         self.agents = {}
-        for name, pos in list(agent_starts.items())[:num_agents]:
-            uid = p.loadURDF("r2d2.urdf", pos, agent_orientation)
-            self.agents[name] = Agent(name, uid, self.task_name_map, policy, self.task_type_map)
+        for name, uid in self.agent_ids.items():
+            self.agents[name] = Agent(name, uid, self.task_name_map, policy, self.task_type_map, self.backend,
+                                      table=self.agent_table)
+
+        # === Per-tick world snapshot ===
+        self.state = WorldState(self.backend, [a.id for a in self.agents.values()], self.object_ids)
 
         # === Initialize protocol ===
-        self.protocol = Protocol(self.agents, self.task_name_map, self.object_ids, self.task_type_map)
+        self.clock.reset()
+        self.stop_trace()
+        self._close_transport()
+        if self.protocol is not None and self.protocol.metrics:
+            self.metrics_history.append(self.protocol.metrics.export())
+        self.protocol = Protocol(self.agents, self.task_name_map, self.object_ids, self.task_type_map,
+                                 clock=self.clock, transport=self.transport,
+                                 metrics=ProtocolMetrics() if self.collect_metrics else None,
+                                 topology=make_topology(self.comm_radius, self.state, self.agents))
 
-    def assign_tasks(self, conflict_ratio=0.8, max_retries=3):
-        assign_conflicting_tasks(self.agents, self.object_ids.copy(), self.task_name_map, conflict_ratio)
+    @property
+    def sim_time(self):
+        """Simulated seconds elapsed in the current episode."""
+        return self.backend.sim_time
 
-        # === initialize agents priorities===
-        fixed_weight = {
-            "agent1": 0,
-            "agent2": 2,
-            "agent3": 5
+    @property
+    def tick_duration(self):
+        """Simulated seconds covered by one decision tick."""
+        return self.frame_skip * self.backend.time_step
+
+    def reset(self, seed=None):
+        """
+        Starts a new episode and returns the stacked agent observations.
+        Restores the snapshot taken after the first scene build and re-samples the
+        object poses in place, so no URDF is parsed again.
+        """
+        if seed is not None:
+            random.seed(seed)
+            np.random.seed(seed)
+        self.backend.restore_state(self.scene_state)
+        for obj_id, pos in zip(self.object_ids, self.scene.object_positions()):
+            self.backend.reset_position(obj_id, pos)
+        if self.scene.agent_layout == "random":
+            for uid, pos in zip(self.agent_ids.values(), self.scene.agent_positions()):
+                self.backend.reset_position(uid, pos)
+        self._init_episode()
+        return self.get_obs()
+
+    def get_obs(self):
+        """Returns a (num_agents, 2, 20) array of observations from the latest snapshot."""
+        state = self.state.capture() if self.state.tick < 0 else self.state
+        obs = np.zeros((len(self.agents), 2, 20))
+        for i, agent in enumerate(self.agents.values()):
+            task = agent.get_effective_task()
+            if task is not None:
+                obs[i] = self.protocol.get_agent_obs(agent, task, state)
+        return obs
+
+    def get_info(self):
+        """Returns a picklable summary of agent and protocol state."""
+        return {
+            "tick": self.state.tick,
+            "tasks": {name: a.task for name, a in self.agents.items()},
+            "reached_goal": {name: a.reached_goal for name, a in self.agents.items()},
+            "assisting": {name: a.assisting for name, a in self.agents.items()},
+            "outcomes": dict(self.protocol.outcomes),
         }
 
+    def export_metrics(self, path=None):
+        """Returns the current episode's protocol metrics (None if disabled), optionally saving them as JSON."""
+        metrics = self.protocol.metrics
+        if not metrics:
+            return None
+        if path is not None:
+            metrics.save(path)
+        return metrics.export()
+
+    def start_trace(self, path, chunk_ticks=256):
+        """Records the current episode from the next tick on into a binary trace (see tracing.py)."""
+        self.stop_trace()
+        self.recorder = TraceRecorder(path, self, chunk_ticks)
+        return self.recorder
+
+    def stop_trace(self):
+        """Flushes and closes the active trace; a reset or close() also ends it."""
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def assign_tasks(self, conflict_ratio=0.8, max_retries=3, mode="retry"):
+        """
+        Generates (conflicting) claims, scores priorities and resolves the claims.
+        mode="retry" runs the claim → evaluate → boost/re-pick rounds; "hungarian" and
+        "auction" resolve every conflict in one pass through an AssignmentEngine.
+        """
+        assign_conflicting_tasks(self.agents, self.object_ids.copy(), self.task_name_map, conflict_ratio)
+
+        # === initialize agents priorities===
+        state = self.state.capture()
         for name, agent in self.agents.items():
-            agent_xy = np.array(p.getBasePositionAndOrientation(agent.id)[0][:2])
-            total_dist = 0.0
-            for obj_id in self.object_ids:
-                obj_xy = np.array(p.getBasePositionAndOrientation(obj_id)[0][:2])
-                total_dist += np.linalg.norm(agent_xy - obj_xy)
-            avg_dist = total_dist / len(self.object_ids)
+            avg_dist = state.distances.mean_distance(agent.id)
 
             distance_score = avg_dist * 10  # index
-            weight_score = fixed_weight.get(name, 0)
+            weight_score = self.agent_weights.get(name, 0)
             agent.priority = int(distance_score + weight_score)
 
             agent.try_count = 0
-            print(f"[INIT] {agent.name} priority={agent.priority:.1f} (dist={distance_score:.1f} + weight={weight_score})")
+            EVENTS.info("assign", "INIT", "%s priority=%.1f (dist=%.1f + weight=%s)", agent.name, agent.priority, distance_score, weight_score)
+
+        if mode != "retry":
+            success = AssignmentEngine(mode).assign(self.protocol, state)
+            if success:
+                EVENTS.info("assign", "SUCCESS", "All agents assigned.")
+            return success
 
         for attempt in range(max_retries):
-            print(f"\n=== Attempt #{attempt} ===")
+            EVENTS.info("assign", None, "\n=== Attempt #%d ===", attempt)
             self.protocol.receive_claims()
             self.protocol.evaluate_conflicts()
             success = self.protocol.resolve_outcomes()
 
             if success:
-                print("[SUCCESS] All agents assigned.")
-                break
+                EVENTS.info("assign", "SUCCESS", "All agents assigned.")
+                return True
 
             for agent in self.agents.values():
                 if agent.task not in self.protocol.outcomes:
                     continue
                 winner = self.protocol.outcomes[agent.task]
                 if winner != agent.name:
-                    print(f"[REASSIGN] {agent.name} failed to get {self.task_name_map.get(agent.task, 'None')} → reselecting task")
+                    EVENTS.info("assign", "REASSIGN", "%s failed to get %s → reselecting task", agent.name, self.task_name_map.get(agent.task, 'None'))
                     
                     # === increase priority ===
                     agent.try_count += 1
                     agent.priority += 5  
-                    print(f"[BOOST] {agent.name} priority increased to {agent.priority} (attempt {agent.try_count})")
+                    EVENTS.info("assign", "BOOST", "%s priority increased to %s (attempt %s)", agent.name, agent.priority, agent.try_count)
 
                     # === reassign task ===
                     agent.task = None
@@ -106,49 +205,75 @@ class SimEnv:
                     available_tasks = [t for t in self.object_ids if t not in used_by_others]
 
                     if available_tasks:
-                        new_task = agent.policy.choose(agent, available_tasks)
+                        new_task = agent.policy.choose(agent, available_tasks, state)
                         if new_task:
                             agent.task = new_task
-                            print(f"[REASSIGN] {agent.name} → new task {self.task_name_map[new_task]}")
-
+                            EVENTS.info("assign", "REASSIGN", "%s → new task %s", agent.name, self.task_name_map[new_task])
+        return False
 
     def step(self):
+        state = self.pre_tick()
+        # Agents only change their own fields while updating, so who still moves is known up front
+        agents = self.agent_table.agents
+        for row in self.agent_table.moving_rows():
+            agent = agents[row]
+            if self.prepare_agent(agent):
+                agent.update(self.protocol, state)
+        self.post_tick()
+
+    def pre_tick(self):
+        """Snapshots the world and runs the protocol housekeeping that precedes agent decisions."""
+        state = self.state.capture()
+        if self.recorder:
+            self.recorder.begin_tick(state, self.clock.time())
         self.protocol.cleanup_expired_messages()
         self.protocol.handle_assist_requests()
+        return state
 
-        for agent in self.agents.values():
-            # === Auto trigger cooperative assist request if not already sent ===
-            if agent.reached_goal:
-                continue
-
-            if self.task_type_map.get(agent.task) == "cooperative":
-                already_requested = any(r["sender"] == agent.name and r["task_id"] == agent.task
-                                        for r in self.protocol.assist_requests)
-                if not already_requested:
-                    if self.protocol.get_assist_request_sender(agent.task) is None:
-                        assist_msg = self.protocol.create_request_assist(agent.name, agent.task)
-                        self.protocol.assist_requests.append(assist_msg)
-                        print(f"[AUTO-ASSIST] {agent.name} initiated assist for {self.task_name_map[agent.task]}")
-
-            agent.update(self.protocol)
-
-        # Remove tasks that were not accepted in conflict resolution
-        for agent in self.agents.values():
-            # If task is assisting then skip
-            if agent.assisting:
-                continue
-
-            accepted = any(
-                winner == agent.name and agent.task == task
-                for task, winner in self.protocol.outcomes.items()
-            )
-            if not accepted:
-                agent.task = None
+    def prepare_agent(self, agent):
+        """Sends the agent's automatic assist request if due; returns whether it should update this tick."""
+        # === Auto trigger cooperative assist request if not already sent ===
+        if agent.reached_goal:
+            return False
+
+        task = agent.task
+        if self.task_type_map.get(task) == "cooperative":
+            if not self.protocol.has_assist_request(agent.name, task):
+                if self.protocol.get_assist_request_sender(task) is None:
+                    assist_msg = self.protocol.create_request_assist(agent.name, task)
+                    self.protocol.add_assist_request(assist_msg)
+                    EVENTS.info("env", "AUTO-ASSIST", "%s initiated assist for %s", agent.name, self.task_name_map[task])
+        return True
+
+    def post_tick(self):
+        """Drops unaccepted claims, then advances physics and the protocol clock by one tick."""
+        # Remove tasks that were not accepted in conflict resolution (assisting agents are skipped)
+        agents = self.agent_table.agents
+        for row in self.agent_table.unaccepted_rows(self.protocol.outcomes):
+            agents[row].task = None
 
         # for agent in self.agents.values():
         #     print(f"[STATE] {agent.name} task={agent.task}, assist={agent.assist_task_id}, assisting={agent.assisting}, started={agent.started}")
+        if self.recorder:
+            self.recorder.end_tick(self.state)
+
+        for _ in range(self.frame_skip):
+            self.backend.step()
+        self.clock.advance(self.tick_duration)
 
-        p.stepSimulation()
+    def _close_transport(self):
+        # Transports built from a name belong to the episode; passed-in instances belong to the caller
+        if self.protocol is not None and isinstance(self.transport, str):
+            self.protocol.transport.close()
 
     def close(self):
-        p.disconnect()
+        self.stop_trace()
+        self._close_transport()
+        self.backend.close()
+
+
+class KinematicSimEnv(SimEnv):
+    """SimEnv on the pure-NumPy kinematic backend, for large protocol/scheduling runs."""
+
+    def __init__(self, num_agents=3, num_objects=3, frame_skip=1, **scene_kwargs):
+        super().__init__(num_agents, num_objects, backend="kinematic", frame_skip=frame_skip, **scene_kwargs)
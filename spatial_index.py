@@ -0,0 +1,134 @@
+# spatial_index.py
+
+import math
+import numpy as np
+
+class SpatialGrid:
+    """Uniform grid over planar points answering k-nearest and radius-neighbor queries."""
+
+    def __init__(self, cell_size=None):
+        self.fixed_cell_size = cell_size  # None → sized from the point density on each rebuild
+        self.ids = np.zeros(0, dtype=int)
+        self.xy = np.zeros((0, 2))
+        self.cells = {}
+        self.order = np.zeros(0, dtype=int)
+        self.origin = np.zeros(2)
+        self.cell_size = 1.0
+        self.shape = (0, 0)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def rebuild(self, ids, xy):
+        """Re-buckets every point; skipped when nothing moved since the last rebuild."""
+        ids = np.asarray(ids, dtype=int)
+        xy = np.asarray(xy, dtype=float)
+        if np.array_equal(ids, self.ids) and np.array_equal(xy, self.xy):
+            return
+        self.ids = ids.copy()
+        self.xy = xy.copy()
+        n = len(xy)
+        if n == 0:
+            self.cells = {}
+            self.shape = (0, 0)
+            return
+
+        lo, hi = xy.min(axis=0), xy.max(axis=0)
+        extent = float(np.max(hi - lo))
+        cell = self.fixed_cell_size or extent / max(1.0, math.sqrt(n / 2))  # ~2 points per cell
+        self.cell_size = max(cell, 1e-3)
+        self.origin = lo
+
+        cxy = np.floor((xy - lo) / self.cell_size).astype(np.int64)
+        nx, ny = int(cxy[:, 0].max()) + 1, int(cxy[:, 1].max()) + 1
+        self.shape = (nx, ny)
+
+        keys = cxy[:, 0] * ny + cxy[:, 1]
+        self.order = np.argsort(keys, kind="stable")
+        uniq, starts = np.unique(keys[self.order], return_index=True)
+        ends = np.append(starts[1:], n)
+        self.cells = dict(zip(uniq.tolist(), zip(starts.tolist(), ends.tolist())))
+
+    def _cell_of(self, point):
+        c = np.floor((np.asarray(point[:2], dtype=float) - self.origin) / self.cell_size)
+        return int(c[0]), int(c[1])
+
+    def _members(self, cx, cy):
+        nx, ny = self.shape
+        if not (0 <= cx < nx and 0 <= cy < ny):
+            return ()
+        span = self.cells.get(cx * ny + cy)
+        if span is None:
+            return ()
+        return self.order[span[0]:span[1]]
+
+    def _ring(self, cx, cy, r):
+        """Yields the in-grid cells at Chebyshev distance r from (cx, cy)."""
+        nx, ny = self.shape
+        x_lo, x_hi = max(cx - r, 0), min(cx + r, nx - 1)
+        for y in (cy - r, cy + r) if r else (cy,):
+            if 0 <= y < ny:
+                for x in range(x_lo, x_hi + 1):
+                    yield x, y
+        if r == 0:
+            return
+        y_lo, y_hi = max(cy - r + 1, 0), min(cy + r - 1, ny - 1)
+        for x in (cx - r, cx + r):
+            if 0 <= x < nx:
+                for y in range(y_lo, y_hi + 1):
+                    yield x, y
+
+    def k_nearest(self, point, k=1, accept=None):
+        """
+        Returns up to k ids ordered by distance to point.
+        Args:
+            point: (x, y[, z]) query position
+            k: number of neighbours wanted
+            accept: optional container of ids; other ids are skipped
+        """
+        if not len(self.ids):
+            return []
+        cx, cy = self._cell_of(point)
+        nx, ny = self.shape
+        max_ring = max(abs(cx), abs(cx - nx + 1), abs(cy), abs(cy - ny + 1))
+        min_ring = max(0, -cx, cx - nx + 1, -cy, cy - ny + 1)  # first ring touching the grid
+        p = np.asarray(point[:2], dtype=float)
+
+        best = []  # (distance, id), kept sorted and at most k long
+        for r in range(min_ring, max_ring + 1):
+            for x, y in self._ring(cx, cy, r):
+                members = self._members(x, y)
+                if not len(members):
+                    continue
+                dists = np.linalg.norm(self.xy[members] - p, axis=1)
+                for d, i in zip(dists.tolist(), members.tolist()):
+                    uid = int(self.ids[i])
+                    if accept is not None and uid not in accept:
+                        continue
+                    best.append((d, uid))
+            if best:
+                best.sort()
+                del best[k:]
+            # Cells beyond ring r are at least r cells away from the query point
+            if len(best) == k and best[-1][0] <= r * self.cell_size:
+                break
+        return [uid for _, uid in best]
+
+    def within_radius(self, point, radius):
+        """Returns the ids within radius of point, nearest first."""
+        if not len(self.ids):
+            return []
+        p = np.asarray(point[:2], dtype=float)
+        (x0, y0), (x1, y1) = self._cell_of(p - radius), self._cell_of(p + radius)
+        nx, ny = self.shape
+        chunks = [self._members(x, y)
+                  for x in range(max(x0, 0), min(x1, nx - 1) + 1)
+                  for y in range(max(y0, 0), min(y1, ny - 1) + 1)]
+        chunks = [c for c in chunks if len(c)]
+        if not chunks:
+            return []
+        members = np.concatenate(chunks)
+        dists = np.linalg.norm(self.xy[members] - p, axis=1)
+        keep = dists <= radius
+        members, dists = members[keep], dists[keep]
+        return self.ids[members[np.argsort(dists, kind="stable")]].tolist()
@@ -0,0 +1,22 @@
+# test_claim_book.py
+
+from claim_book import ClaimBook
+
+
+def test_reentered_claim_keeps_heap_bounded():
+    book = ClaimBook(["agent1", "agent2"])
+    book.update("agent1", "T", 5)
+    for _ in range(10000):
+        book.update("agent2", "U", 1)
+        book.update("agent2", "T", 1)
+    assert book.counts["T"] == 2
+    assert len(book.heaps["T"]) <= 2 * book.counts["T"] + 8
+    assert book.evaluate()["T"] == "agent1"
+
+    book.update("agent1", None, 0)
+    assert book.winner("T") == "agent2"
+
+
+if __name__ == "__main__":
+    test_reentered_claim_keeps_heap_bounded()
+    print("ClaimBook heap stays bounded")
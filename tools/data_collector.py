@@ -14,24 +14,32 @@ SAVE_PATH = Path("data/collected_trajs")
 SAVE_PATH.mkdir(parents=True, exist_ok=True)
 
 # === Bullet Setup ===
-p.connect(p.DIRECT)
-p.setAdditionalSearchPath(pybullet_data.getDataPath())
+CLIENT = p.connect(p.DIRECT)
+p.setAdditionalSearchPath(pybullet_data.getDataPath(), physicsClientId=CLIENT)
 
-def reset_world():
-    p.resetSimulation()
-    p.setGravity(0, 0, -9.8)
-    p.loadURDF("plane.urdf")
+def build_world(client=CLIENT):
+    """Loads the scene once and snapshots it; episodes restore the snapshot instead of reloading URDFs."""
+    p.resetSimulation(physicsClientId=client)
+    p.setGravity(0, 0, -9.8, physicsClientId=client)
+    p.loadURDF("plane.urdf", physicsClientId=client)
+    agent_id = p.loadURDF("r2d2.urdf", [0, 0, 0.5], physicsClientId=client)
+    obj_id = p.loadURDF("cube_small.urdf", [0, 0, 0.5], physicsClientId=client)
+    state_id = p.saveState(physicsClientId=client)
+    return agent_id, obj_id, state_id
+
+def reset_world(agent_id, obj_id, state_id, client=CLIENT):
+    p.restoreState(stateId=state_id, physicsClientId=client)
     agent_pos = np.random.uniform([-1, -1, 0.5], [1, 1, 0.5])
     obj_pos = np.random.uniform([-1, -1, 0.5], [1, 1, 0.5])
-    agent_id = p.loadURDF("r2d2.urdf", agent_pos)
-    obj_id = p.loadURDF("cube_small.urdf", obj_pos)
+    p.resetBasePositionAndOrientation(agent_id, agent_pos, [0, 0, 0, 1], physicsClientId=client)
+    p.resetBasePositionAndOrientation(obj_id, obj_pos, [0, 0, 0, 1], physicsClientId=client)
     return agent_id, obj_id
 
-def get_obs(agent_id, obj_id):
-    agent_pos, _ = p.getBasePositionAndOrientation(agent_id)
-    agent_vel, _ = p.getBaseVelocity(agent_id)
-    obj_pos, _ = p.getBasePositionAndOrientation(obj_id)
-    obj_vel, _ = p.getBaseVelocity(obj_id)
+def get_obs(agent_id, obj_id, client=CLIENT):
+    agent_pos, _ = p.getBasePositionAndOrientation(agent_id, physicsClientId=client)
+    agent_vel, _ = p.getBaseVelocity(agent_id, physicsClientId=client)
+    obj_pos, _ = p.getBasePositionAndOrientation(obj_id, physicsClientId=client)
+    obj_vel, _ = p.getBaseVelocity(obj_id, physicsClientId=client)
     one_hot = np.zeros(8)
     one_hot[0] = 1.0  # assume cube_0
     return np.concatenate([
@@ -41,21 +49,23 @@ def get_obs(agent_id, obj_id):
         one_hot
     ])
 
-def move_towards(agent_id, target, step_size=0.05):
-    pos, _ = p.getBasePositionAndOrientation(agent_id)
+def move_towards(agent_id, target, step_size=0.05, client=CLIENT):
+    pos, _ = p.getBasePositionAndOrientation(agent_id, physicsClientId=client)
     direction = np.array(target[:2]) - np.array(pos[:2])
     norm = np.linalg.norm(direction)
     if norm > step_size:
         direction = direction / norm * step_size
     new_xy = np.array(pos[:2]) + direction
-    p.resetBasePositionAndOrientation(agent_id, [new_xy[0], new_xy[1], pos[2]], [0, 0, 0, 1])
+    p.resetBasePositionAndOrientation(agent_id, [new_xy[0], new_xy[1], pos[2]], [0, 0, 0, 1], physicsClientId=client)
     return new_xy
 
 # === Collect
 obs_list, action_list = [], []
 
+agent_id, obj_id, scene_state = build_world()
+
 for ep in range(NUM_EPISODES):
-    agent_id, obj_id = reset_world()
+    reset_world(agent_id, obj_id, scene_state)
     obs_buf = deque(maxlen=OBS_HORIZON)
     pos_buf = []
 
@@ -68,11 +78,11 @@ for ep in range(NUM_EPISODES):
 
         # start recording future positions
         future_positions = []
-        target_pos, _ = p.getBasePositionAndOrientation(obj_id)
+        target_pos, _ = p.getBasePositionAndOrientation(obj_id, physicsClientId=CLIENT)
         for _ in range(ACTION_HORIZON):
             agent_xy = move_towards(agent_id, target_pos)
-            p.stepSimulation()
-            pos, _ = p.getBasePositionAndOrientation(agent_id)
+            p.stepSimulation(physicsClientId=CLIENT)
+            pos, _ = p.getBasePositionAndOrientation(agent_id, physicsClientId=CLIENT)
             future_positions.append(np.array(pos[:2]))
 
         obs_list.append(obs_seq)
@@ -81,7 +91,7 @@ for ep in range(NUM_EPISODES):
         # reset for next sample in episode
         obs_buf.clear()
 
-p.disconnect()
+p.disconnect(physicsClientId=CLIENT)
 
 # === Save
 obs_arr = np.array(obs_list)     # (N, 2, 20)
@@ -0,0 +1,56 @@
+# topology.py
+
+class FullTopology:
+    """Every agent hears every other agent (the original broadcast behaviour)."""
+    comm_radius = None
+
+    def reachable(self, sender, names):
+        return names
+
+    def can_reach(self, sender, receiver):
+        return True
+
+
+class RangeTopology:
+    """
+    Agents only hear each other within comm_radius (planar distance at the start of the tick).
+    Neighbour sets come from the WorldState agent grid, which is rebuilt once per tick,
+    and are cached per sender for the rest of the tick.
+    """
+
+    def __init__(self, state, agents, comm_radius):
+        self.state = state
+        self.comm_radius = comm_radius
+        self.uid_to_name = {a.id: name for name, a in agents.items()}
+        self.name_to_uid = {name: a.id for name, a in agents.items()}
+        self.cache = {}
+        self.cache_tick = None
+
+    def neighbors(self, name):
+        """Returns the set of agent names within comm_radius of name, excluding itself."""
+        if self.cache_tick != self.state.tick:
+            self.cache.clear()
+            self.cache_tick = self.state.tick
+        found = self.cache.get(name)
+        if found is None:
+            uids = self.state.agents_within(self.name_to_uid[name], self.comm_radius)
+            found = self.cache[name] = {self.uid_to_name[uid] for uid in uids}
+        return found
+
+    def reachable(self, sender, names):
+        """Returns the subset of the names set that sender can reach."""
+        if sender not in self.name_to_uid:
+            return names
+        return self.neighbors(sender).intersection(names)
+
+    def can_reach(self, sender, receiver):
+        if sender not in self.name_to_uid:
+            return True
+        return receiver in self.neighbors(sender)
+
+
+def make_topology(comm_radius, state, agents):
+    """Range-limited topology when comm_radius is set, full broadcast otherwise."""
+    if comm_radius is None:
+        return FullTopology()
+    return RangeTopology(state, agents, comm_radius)
@@ -0,0 +1,283 @@
+# tracing.py
+
+import json
+import struct
+
+import numpy as np
+
+from messages import MsgKind
+
+MAGIC = b"MCPTRC1\n"
+_LEN = struct.Struct("<I")
+NONE_ID = -1
+
+# Recorded agent fields: ids (None stored as -1), priority, then boolean flags packed into bits
+ID_FIELDS = {"task": 0, "assist_task_id": 1, "backup_task": 2}
+PRIORITY_ROW = 3
+FLAG_ROW = 4
+FLAG_FIELDS = ("reached_goal", "assisting", "sync_start", "waiting_for_sync", "started")
+FLAG_BITS = {field: 1 << i for i, field in enumerate(FLAG_FIELDS)}
+REACHED, ASSISTING, SYNC_START, WAITING, STARTED = FLAG_BITS.values()
+
+# Per-tick columns; shapes use A = agents, B = bodies (agents then tasks)
+TICK_COLUMNS = {
+    "tick": ("int32", ()),
+    "time": ("float64", ()),
+    "positions": ("float64", ("B", 3)),
+    "orientations": ("float64", ("B", 4)),
+    "linear_velocities": ("float64", ("B", 3)),
+    # Decisions at the end of the tick: commanded agent positions, agent fields
+    "commanded": ("float64", ("A", 3)),
+    "task": ("int32", ("A",)),
+    "assist_task": ("int32", ("A",)),
+    "backup_task": ("int32", ("A",)),
+    "priority": ("int32", ("A",)),
+    "flags": ("uint8", ("A",)),
+}
+# Event tables, one row per message / outcome change
+MESSAGE_COLUMNS = {"msg_tick": "int32", "msg_kind": "uint8", "msg_sender": "int16",
+                   "msg_receiver": "int16", "msg_task": "int32"}
+OUTCOME_COLUMNS = {"out_tick": "int32", "out_task": "int32", "out_winner": "int16"}
+AGENT_COLUMNS = ("task", "assist_task", "backup_task", "priority", "flags")
+
+
+def _id(value):
+    return NONE_ID if value is None else value
+
+def agent_snapshot(agent):
+    """Recorded agent fields: (task, assist_task, backup_task, priority, flags)."""
+    flags = 0
+    for field, bit in FLAG_BITS.items():
+        if getattr(agent, field):
+            flags |= bit
+    return tuple(_id(getattr(agent, f)) for f in ID_FIELDS) + (int(agent.priority), flags)
+
+def restore_agent(agent, snapshot):
+    """Sets an agent's recorded fields from an agent_snapshot tuple (the inverse of agent_snapshot)."""
+    for field, row in ID_FIELDS.items():
+        setattr(agent, field, None if snapshot[row] == NONE_ID else int(snapshot[row]))
+    agent.priority = int(snapshot[PRIORITY_ROW])
+    for field, bit in FLAG_BITS.items():
+        setattr(agent, field, bool(snapshot[FLAG_ROW] & bit))
+
+def flag_names(flags):
+    return [field for field, bit in FLAG_BITS.items() if flags & bit]
+
+
+class TraceTap:
+    """
+    Protocol tracer hooks: mirrors the recorded agent fields into live rows as they change
+    and collects the messages and outcome decisions of the current tick.
+    """
+
+    def __init__(self, agents):
+        self.agents = list(agents)
+        self.agent_index = {a.name: i for i, a in enumerate(self.agents)}
+        self.num_agents = len(self.agents)
+        self.tick = NONE_ID
+        # One row per AGENT_COLUMNS entry, one column per agent
+        self.fields = np.array([agent_snapshot(a) for a in self.agents], dtype=np.int32).reshape(-1, len(AGENT_COLUMNS)).T.copy()
+        self.messages = []
+        self.outcome_changes = []
+
+    def on_message(self, kind, sender, task_id, receiver=None):
+        self.messages.append((self.tick, int(kind), self.agent_index.get(sender, NONE_ID),
+                              NONE_ID if receiver is None else self.agent_index.get(receiver, NONE_ID),
+                              _id(task_id)))
+
+    def on_agent_change(self, agent, field, new):
+        """Mirrors a tracked Agent field change into the live field rows."""
+        i = self.agent_index[agent.name]
+        if field in ID_FIELDS:
+            self.fields[ID_FIELDS[field], i] = _id(new)
+        elif field == "priority":
+            self.fields[PRIORITY_ROW, i] = new
+        elif new:
+            self.fields[FLAG_ROW, i] |= FLAG_BITS[field]
+        else:
+            self.fields[FLAG_ROW, i] &= ~FLAG_BITS[field]
+
+    def on_outcome(self, task_id, winner):
+        """Records a conflict-resolution result; winner None means the outcome was dropped."""
+        self.outcome_changes.append((self.tick, task_id, NONE_ID if winner is None else self.agent_index[winner]))
+
+
+class TraceRecorder(TraceTap):
+    """
+    Records one episode tick by tick into a chunked, columnar binary file: world poses
+    at the start of each tick, agent moves and task/assist fields at its end, every protocol
+    message and every outcome change. Columns are buffered for chunk_ticks ticks and
+    written as raw little-endian arrays behind a small JSON chunk header.
+    """
+
+    def __init__(self, path, env, chunk_ticks=256):
+        super().__init__(env.agents.values())
+        self.env = env
+        self.chunk_ticks = chunk_ticks
+        self.ticks_recorded = 0
+        self._reset_chunk()
+
+        protocol = env.protocol
+        header = {
+            "agents": [a.name for a in self.agents],
+            "agent_ids": [a.id for a in self.agents],
+            "task_ids": list(env.object_ids),
+            "task_names": [env.task_name_map[t] for t in env.object_ids],
+            "task_types": [env.task_type_map[t] for t in env.object_ids],
+            "body_ids": list(env.state.body_ids),
+            "tick_duration": env.tick_duration,
+            "message_ttl": protocol.message_ttl,
+            "sync_requires_reach": protocol.sync_requires_reach,
+            "comm_radius": env.comm_radius,
+            "start_time": protocol.clock.time(),
+            "start_tick": env.state.tick,
+            # Decision state the replay starts from
+            "initial_agents": [agent_snapshot(a) for a in self.agents],
+            "initial_outcomes": [[t, self.agent_index[w]] for t, w in protocol.outcomes.items()],
+            "columns": {name: [dtype, list(shape)] for name, (dtype, shape) in TICK_COLUMNS.items()},
+        }
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+        self._write_block(json.dumps(header).encode())
+        protocol.tracer = self
+
+    def _reset_chunk(self):
+        self.rows = {name: [] for name in TICK_COLUMNS if name not in AGENT_COLUMNS}
+        self.agent_rows = []
+        self.messages = []
+        self.outcome_changes = []
+
+    def _write_block(self, data):
+        self.file.write(_LEN.pack(len(data)))
+        self.file.write(data)
+
+    # === Hooks ===
+    def begin_tick(self, state, now):
+        """Captures the poses every decision of this tick is based on."""
+        self.tick = state.tick
+        rows = self.rows
+        rows["tick"].append(state.tick)
+        rows["time"].append(now)
+        rows["positions"].append(state.positions.copy())
+        rows["orientations"].append(state.orientations.copy())
+        rows["linear_velocities"].append(state.linear_velocities.copy())
+
+    def end_tick(self, state):
+        """Captures agent moves and fields once the tick's decisions are done."""
+        self.rows["commanded"].append(state.positions[:self.num_agents].copy())
+        self.agent_rows.append(self.fields.copy())
+        self.ticks_recorded += 1
+        if len(self.agent_rows) >= self.chunk_ticks:
+            self.flush()
+
+    # === Output ===
+    def flush(self):
+        """Writes the buffered ticks as one chunk."""
+        n = len(self.rows["tick"])
+        if n == 0 and not self.messages and not self.outcome_changes:
+            return
+        arrays = {}
+        fields = np.stack(self.agent_rows) if self.agent_rows else np.zeros((0, len(AGENT_COLUMNS), self.num_agents))
+        for name, (dtype, _) in TICK_COLUMNS.items():
+            if name in AGENT_COLUMNS:
+                arrays[name] = fields[:, AGENT_COLUMNS.index(name)].astype(dtype)
+            else:
+                arrays[name] = np.asarray(self.rows[name], dtype=dtype)
+        for table, columns in ((self.messages, MESSAGE_COLUMNS), (self.outcome_changes, OUTCOME_COLUMNS)):
+            values = list(zip(*table)) if table else [()] * len(columns)
+            for (name, dtype), col in zip(columns.items(), values):
+                arrays[name] = np.asarray(col, dtype=dtype)
+
+        layout = [[name, a.dtype.str, list(a.shape)] for name, a in arrays.items()]
+        self._write_block(json.dumps({"ticks": n, "columns": layout}).encode())
+        for a in arrays.values():
+            self.file.write(np.ascontiguousarray(a).tobytes())
+        self._reset_chunk()
+
+    def close(self):
+        if self.file is None:
+            return
+        self.flush()
+        self.file.close()
+        self.file = None
+        if self.env.protocol.tracer is self:
+            self.env.protocol.tracer = None
+
+
+class TraceReader:
+    """Loads a trace written by TraceRecorder into whole-run column arrays."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data.startswith(MAGIC):
+            raise ValueError(f"{path} is not a trace file")
+        pos = len(MAGIC)
+        header, pos = self._read_block(data, pos)
+        self.header = json.loads(header)
+
+        chunks = []
+        while pos < len(data):
+            meta, pos = self._read_block(data, pos)
+            meta = json.loads(meta)
+            arrays = {}
+            for name, dtype, shape in meta["columns"]:
+                dtype = np.dtype(dtype)
+                count = int(np.prod(shape)) if shape else 1
+                arrays[name] = np.frombuffer(data, dtype=dtype, count=count, offset=pos).reshape(shape)
+                pos += count * dtype.itemsize
+            chunks.append(arrays)
+
+        names = list(TICK_COLUMNS) + list(MESSAGE_COLUMNS) + list(OUTCOME_COLUMNS)
+        self.columns = {}
+        for name in names:
+            parts = [c[name] for c in chunks if name in c]
+            self.columns[name] = np.concatenate(parts) if parts else np.zeros(0)
+        self.agents = self.header["agents"]
+        self.task_ids = self.header["task_ids"]
+        # Event rows sorted by tick (stable, so emission order is kept) for per-tick lookups
+        self._msg_order = np.argsort(self.columns["msg_tick"], kind="stable")
+        self._msg_ticks = self.columns["msg_tick"][self._msg_order]
+        self._out_order = np.argsort(self.columns["out_tick"], kind="stable")
+        self._out_ticks = self.columns["out_tick"][self._out_order]
+
+    @staticmethod
+    def _read_block(data, pos):
+        (n,) = _LEN.unpack_from(data, pos)
+        pos += _LEN.size
+        return data[pos:pos + n], pos + n
+
+    def __len__(self):
+        return len(self.columns["tick"])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def frame(self, i):
+        """Returns the per-tick columns of the i-th recorded tick as a dict."""
+        return {name: self.columns[name][i] for name in TICK_COLUMNS}
+
+    def message_rows(self, tick):
+        """Returns the raw (kind, sender, receiver, task) index rows recorded during tick, in emission order."""
+        lo, hi = np.searchsorted(self._msg_ticks, [tick, tick + 1])
+        c = self.columns
+        return [(int(c["msg_kind"][r]), int(c["msg_sender"][r]), int(c["msg_receiver"][r]), int(c["msg_task"][r]))
+                for r in self._msg_order[lo:hi]]
+
+    def decode_message(self, row):
+        """Turns a raw message row into (MsgKind, sender, receiver, task_id) with names and None."""
+        kind, sender, receiver, task = row
+        return (MsgKind(kind), self.agents[sender] if sender >= 0 else None,
+                self.agents[receiver] if receiver >= 0 else None, None if task == NONE_ID else task)
+
+    def messages_at(self, tick):
+        """Returns [(kind, sender, receiver, task_id)] recorded during tick, in emission order."""
+        return [self.decode_message(row) for row in self.message_rows(tick)]
+
+    def outcome_changes_at(self, tick):
+        """Returns [(task_id, winner or None)] outcome decisions recorded during tick, in order."""
+        c = self.columns
+        lo, hi = np.searchsorted(self._out_ticks, [tick, tick + 1])
+        rows = self._out_order[lo:hi]
+        return [(int(c["out_task"][r]), self.agents[c["out_winner"][r]] if c["out_winner"][r] >= 0 else None)
+                for r in rows]
@@ -0,0 +1,238 @@
+# transport.py
+
+import errno
+import multiprocessing as mp
+import os
+import shutil
+import socket
+import struct
+import tempfile
+from multiprocessing import shared_memory
+
+from message_queue import MessageQueue
+from messages import Message
+
+class InProcessTransport:
+    """Mailboxes in this process's memory (the default); expiry runs on the shared time wheel."""
+    name = "inprocess"
+
+    def __init__(self, receivers):
+        self.queue = MessageQueue(receivers)
+
+    def send(self, receiver, msg):
+        self.queue.push(receiver, msg, msg.timestamp, msg.ttl)
+        return True
+
+    def recv(self, receiver, now):
+        """Returns and consumes every live message for receiver."""
+        return self.queue.pop_all(receiver)
+
+    def expire(self, now):
+        return self.queue.expire(now)
+
+    def pending(self, receiver):
+        return self.queue.depth(receiver)
+
+    def close(self):
+        pass
+
+
+# === Shared-memory ring buffers ===
+
+# head (next byte to read), tail (next byte to write), both monotonic; count of unread records
+_RING_HEADER = struct.Struct("<QQQ")
+_RECORD_LEN = struct.Struct("<H")
+
+
+class SharedMemoryTransport:
+    """
+    One byte ring buffer per receiver in a single multiprocessing SharedMemory block.
+    Messages travel packed (Message.pack); expired ones are dropped on recv. Pass the
+    transport to worker processes as a Process argument; the block and lock travel by name.
+    """
+    name = "shm"
+
+    def __init__(self, receivers, ring_bytes=1 << 16, start_method=None):
+        self.receivers = list(receivers)
+        self.ring_bytes = ring_bytes
+        self.slot = {name: i for i, name in enumerate(self.receivers)}
+        self.stride = _RING_HEADER.size + ring_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, self.stride * len(self.receivers)))
+        self.shm.buf[:] = bytes(len(self.shm.buf))
+        self.lock = mp.get_context(start_method).Lock()  # must match the workers' start method
+        self.owner_pid = os.getpid()  # only the creating process unlinks the block (forked children inherit it)
+        self.dropped = 0  # messages rejected because a ring was full
+
+    def __getstate__(self):
+        return {"receivers": self.receivers, "ring_bytes": self.ring_bytes,
+                "shm_name": self.shm.name, "lock": self.lock}
+
+    def __setstate__(self, state):
+        self.receivers = state["receivers"]
+        self.ring_bytes = state["ring_bytes"]
+        self.slot = {name: i for i, name in enumerate(self.receivers)}
+        self.stride = _RING_HEADER.size + self.ring_bytes
+        self.shm = shared_memory.SharedMemory(name=state["shm_name"])
+        self.lock = state["lock"]
+        self.owner_pid = None
+        self.dropped = 0
+
+    def _copy_in(self, base, pos, data):
+        start = pos % self.ring_bytes
+        first = min(len(data), self.ring_bytes - start)
+        buf = self.shm.buf
+        buf[base + start:base + start + first] = data[:first]
+        buf[base:base + len(data) - first] = data[first:]
+
+    def _copy_out(self, base, pos, size):
+        start = pos % self.ring_bytes
+        first = min(size, self.ring_bytes - start)
+        buf = self.shm.buf
+        return bytes(buf[base + start:base + start + first]) + bytes(buf[base:base + size - first])
+
+    def send(self, receiver, msg):
+        """Appends msg to the receiver's ring; returns False (and counts a drop) if it is full."""
+        data = msg.pack()
+        record = _RECORD_LEN.pack(len(data)) + data
+        offset = self.slot[receiver] * self.stride
+        base = offset + _RING_HEADER.size
+        with self.lock:
+            head, tail, count = _RING_HEADER.unpack_from(self.shm.buf, offset)
+            if tail + len(record) - head > self.ring_bytes:
+                self.dropped += 1
+                return False
+            self._copy_in(base, tail, record)
+            _RING_HEADER.pack_into(self.shm.buf, offset, head, tail + len(record), count + 1)
+        return True
+
+    def recv(self, receiver, now):
+        """Drains the receiver's ring, returning the messages that have not expired."""
+        offset = self.slot[receiver] * self.stride
+        base = offset + _RING_HEADER.size
+        with self.lock:
+            head, tail, _ = _RING_HEADER.unpack_from(self.shm.buf, offset)
+            raw = self._copy_out(base, head, tail - head)
+            _RING_HEADER.pack_into(self.shm.buf, offset, tail, tail, 0)
+        msgs, pos = [], 0
+        while pos < len(raw):
+            (size,) = _RECORD_LEN.unpack_from(raw, pos)
+            msg = Message.unpack_from(raw, pos + _RECORD_LEN.size)[0]
+            pos += _RECORD_LEN.size + size
+            if msg.expires_at >= now:
+                msgs.append(msg)
+        return msgs
+
+    def expire(self, now):
+        return 0  # expired records are skipped by recv
+
+    def pending(self, receiver):
+        """Number of unread messages in the receiver's ring (expired ones included until recv)."""
+        return _RING_HEADER.unpack_from(self.shm.buf, self.slot[receiver] * self.stride)[2]
+
+    def close(self):
+        self.shm.close()
+        if self.owner_pid == os.getpid():
+            self.shm.unlink()
+            self.owner_pid = None
+
+
+# === Unix-domain datagram sockets ===
+
+class UnixSocketTransport:
+    """
+    One SOCK_DGRAM socket per receiver at <socket_dir>/<receiver>.sock. Each process binds
+    the receivers it hosts (bind=...) and can send to any of them; a datagram is one
+    packed Message. Sends to a receiver that is not bound, or whose socket buffer is
+    full, are dropped.
+    """
+    name = "unix"
+
+    def __init__(self, receivers, socket_dir=None, bind=None):
+        self.receivers = list(receivers)
+        self.owns_dir = socket_dir is None
+        self.owner_pid = os.getpid()  # forked children must not unlink the parent's sockets
+        self.socket_dir = socket_dir or tempfile.mkdtemp(prefix="mcp_")
+        self.sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sender.setblocking(False)
+        self.bound = {}
+        for name in (self.receivers if bind is None else bind):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            path = self.path(name)
+            if os.path.exists(path):
+                os.unlink(path)
+            sock.bind(path)
+            sock.setblocking(False)
+            self.bound[name] = sock
+        self.dropped = 0
+
+    def __getstate__(self):
+        # Workers re-bind only what they host: UnixSocketTransport(receivers, socket_dir, bind=[...])
+        return {"receivers": self.receivers, "socket_dir": self.socket_dir}
+
+    def __setstate__(self, state):
+        self.__init__(state["receivers"], state["socket_dir"], bind=())
+
+    def path(self, receiver):
+        return os.path.join(self.socket_dir, f"{receiver}.sock")
+
+    def send(self, receiver, msg):
+        try:
+            self.sender.sendto(msg.pack(), self.path(receiver))
+            return True
+        except (FileNotFoundError, ConnectionRefusedError, BlockingIOError):
+            self.dropped += 1
+            return False
+        except OSError as e:
+            if e.errno not in (errno.ENOBUFS, errno.EAGAIN):
+                raise
+            self.dropped += 1
+            return False
+
+    def recv(self, receiver, now):
+        """Reads every queued datagram for a receiver bound in this process."""
+        sock = self.bound.get(receiver)
+        if sock is None:
+            return []
+        msgs = []
+        while True:
+            try:
+                data = sock.recv(65536)
+            except BlockingIOError:
+                break
+            msg = Message.unpack(data)
+            if msg.expires_at >= now:
+                msgs.append(msg)
+        return msgs
+
+    def expire(self, now):
+        return 0  # expired datagrams are skipped by recv
+
+    def pending(self, receiver):
+        return None  # not observable without reading the socket
+
+    def close(self):
+        owner = self.owner_pid == os.getpid()
+        for name, sock in self.bound.items():
+            sock.close()
+            if owner and os.path.exists(self.path(name)):
+                os.unlink(self.path(name))
+        self.bound = {}
+        self.sender.close()
+        if owner and self.owns_dir:
+            shutil.rmtree(self.socket_dir, ignore_errors=True)
+            self.owns_dir = False
+
+
+TRANSPORTS = {
+    InProcessTransport.name: InProcessTransport,
+    SharedMemoryTransport.name: SharedMemoryTransport,
+    UnixSocketTransport.name: UnixSocketTransport,
+}
+
+def make_transport(transport, receivers, **kwargs):
+    """Returns a transport for the given receivers from its name; instances are passed through."""
+    if not isinstance(transport, str):
+        return transport
+    if transport not in TRANSPORTS:
+        raise ValueError(f"Unknown transport '{transport}', expected one of {tuple(TRANSPORTS)}")
+    return TRANSPORTS[transport](receivers, **kwargs)
@@ -0,0 +1,155 @@
+# vec_env.py
+
+import contextlib
+import multiprocessing as mp
+import os
+
+import numpy as np
+
+from sim_env import SimEnv
+
+def _quiet(verbose):
+    """Returns a context that silences stdout unless verbose is set."""
+    if verbose:
+        return contextlib.nullcontext()
+    stack = contextlib.ExitStack()
+    devnull = stack.enter_context(open(os.devnull, "w"))
+    stack.enter_context(contextlib.redirect_stdout(devnull))
+    return stack
+
+def _handle(env, cmd, data):
+    """Executes one reset/step command against an env and returns (obs, info)."""
+    if cmd == "reset":
+        env.reset(data["seed"])
+        assigned = env.assign_tasks(conflict_ratio=data["conflict_ratio"], mode=data["mode"])
+        info = env.get_info()
+        info["assigned"] = assigned
+        return env.get_obs(), info
+    if cmd == "step":
+        for _ in range(data):
+            env.step()
+        return env.get_obs(), env.get_info()
+    raise ValueError(f"Unknown command '{cmd}'")
+
+def _worker(conn, env_kwargs, verbose):
+    """Owns one SimEnv (and its physics client) and serves commands from the parent."""
+    with _quiet(verbose):
+        env = SimEnv(**env_kwargs)
+        try:
+            while True:
+                cmd, data = conn.recv()
+                if cmd == "close":
+                    break
+                conn.send(_handle(env, cmd, data))
+        finally:
+            env.close()
+            conn.close()
+
+
+class _LocalRemote:
+    """Pipe-like handle around an env living in this process, for the in-process pool."""
+
+    def __init__(self, env_kwargs, verbose):
+        self.verbose = verbose
+        with _quiet(verbose):
+            self.env = SimEnv(**env_kwargs)
+        self.result = None
+
+    def send(self, message):
+        cmd, data = message
+        with _quiet(self.verbose):
+            if cmd == "close":
+                self.env.close()
+            else:
+                self.result = _handle(self.env, cmd, data)
+
+    def recv(self):
+        result, self.result = self.result, None
+        return result
+
+    def close(self):
+        pass
+
+
+class VecSimEnv:
+    """
+    Runs N SimEnv instances and batches reset/step across them.
+    By default each env lives in its own worker process; with in_process=True the
+    envs share this process, each on its own physics client, and step in turn.
+    """
+
+    def __init__(self, num_envs=None, env_kwargs=None, start_method=None, verbose=False, in_process=False):
+        self.num_envs = num_envs or os.cpu_count()
+        self.remotes = []
+        self.processes = []
+        self.closed = False
+
+        if in_process:
+            self.remotes = [_LocalRemote(env_kwargs or {}, verbose) for _ in range(self.num_envs)]
+            return
+
+        ctx = mp.get_context(start_method)
+        for _ in range(self.num_envs):
+            parent_conn, child_conn = ctx.Pipe()
+            proc = ctx.Process(target=_worker, args=(child_conn, env_kwargs or {}, verbose), daemon=True)
+            proc.start()
+            child_conn.close()
+            self.remotes.append(parent_conn)
+            self.processes.append(proc)
+
+    def __len__(self):
+        return self.num_envs
+
+    def _gather(self):
+        results = [remote.recv() for remote in self.remotes]
+        obs, infos = zip(*results)
+        return np.stack(obs), list(infos)
+
+    def reset(self, seeds=None, conflict_ratio=0.8, mode="retry"):
+        """
+        Resets every env and assigns tasks.
+        Args:
+            seeds: one seed per env (or None for unseeded resets)
+            conflict_ratio: forwarded to SimEnv.assign_tasks
+            mode: assignment mode forwarded to SimEnv.assign_tasks
+        Returns:
+            obs: np.ndarray of shape (num_envs, num_agents, 2, 20)
+            infos: list of per-env info dicts
+        """
+        if seeds is None:
+            seeds = [None] * self.num_envs
+        if len(seeds) != self.num_envs:
+            raise ValueError(f"Expected {self.num_envs} seeds, got {len(seeds)}")
+        for remote, seed in zip(self.remotes, seeds):
+            remote.send(("reset", {"seed": seed, "conflict_ratio": conflict_ratio, "mode": mode}))
+        return self._gather()
+
+    def step(self, num_ticks=1):
+        """Advances every env by num_ticks and returns stacked obs plus per-env infos."""
+        for remote in self.remotes:
+            remote.send(("step", num_ticks))
+        return self._gather()
+
+    def rollout(self, seeds, num_ticks, conflict_ratio=0.8, mode="retry"):
+        """Runs one episode per seed, num_envs at a time, and returns the final infos in seed order."""
+        final_infos = []
+        for start in range(0, len(seeds), self.num_envs):
+            batch = list(seeds[start:start + self.num_envs])
+            padded = batch + [None] * (self.num_envs - len(batch))
+            _, reset_infos = self.reset(padded, conflict_ratio, mode)
+            _, infos = self.step(num_ticks)
+            for reset_info, info in zip(reset_infos[:len(batch)], infos[:len(batch)]):
+                info["assigned"] = reset_info["assigned"]
+                final_infos.append(info)
+        return final_infos
+
+    def close(self):
+        if self.closed:
+            return
+        for remote in self.remotes:
+            remote.send(("close", None))
+        for proc in self.processes:
+            proc.join()
+        for remote in self.remotes:
+            remote.close()
+        self.closed = True
@@ -0,0 +1,81 @@
+# world_state.py
+
+import numpy as np
+
+from distance_matrix import DistanceMatrix
+from spatial_index import SpatialGrid
+
+class WorldState:
+    """Per-tick snapshot of body poses and velocities shared by every consumer."""
+
+    def __init__(self, backend, agent_ids, task_ids):
+        self.backend = backend
+        self.agent_ids = list(agent_ids)
+        self.task_ids = list(task_ids)
+        self.body_ids = self.agent_ids + self.task_ids
+        self.id_array = np.asarray(self.body_ids, dtype=int)
+        self.index = {uid: i for i, uid in enumerate(self.body_ids)}
+
+        n = len(self.body_ids)
+        self.positions = np.zeros((n, 3))
+        self.orientations = np.tile([0.0, 0.0, 0.0, 1.0], (n, 1))
+        self.linear_velocities = np.zeros((n, 3))
+        self.angular_velocities = np.zeros((n, 3))
+        self.tick = -1
+
+        # Agents occupy the first rows, tasks the rest
+        self.num_agents = len(self.agent_ids)
+        self.distances = DistanceMatrix(self.agent_ids, self.task_ids)
+
+        # Spatial indexes, rebuilt lazily at most once per tick
+        self.agent_grid = SpatialGrid()
+        self.task_grid = SpatialGrid()
+        self.grid_tick = None
+
+    def capture(self):
+        """Reads every body once from the backend, refreshes distances and advances the tick counter."""
+        self.backend.capture(self)
+        a = self.num_agents
+        self.distances.update(self.positions[:a, :2], self.positions[a:, :2])
+        self.tick += 1
+        return self
+
+    def position(self, uid):
+        """Returns the (3,) position of a body."""
+        return self.positions[self.index[uid]]
+
+    def orientation(self, uid):
+        """Returns the (4,) quaternion of a body."""
+        return self.orientations[self.index[uid]]
+
+    def velocity(self, uid):
+        """Returns the (3,) linear velocity of a body."""
+        return self.linear_velocities[self.index[uid]]
+
+    def positions_xy(self, uids):
+        """Returns an (N, 2) array of planar positions for the given bodies."""
+        rows = [self.index[uid] for uid in uids]
+        return self.positions[rows, :2]
+
+    def refresh_grids(self):
+        """Rebuckets agents and tasks from the tick-start positions kept by the distance matrix."""
+        if self.grid_tick != self.tick:
+            self.agent_grid.rebuild(self.agent_ids, self.distances.agent_xy)
+            self.task_grid.rebuild(self.task_ids, self.distances.task_xy)
+            self.grid_tick = self.tick
+
+    def nearest_tasks(self, uid, k=1, candidates=None):
+        """Returns up to k task ids nearest to a body, optionally restricted to candidates."""
+        self.refresh_grids()
+        if candidates is not None and not isinstance(candidates, (set, frozenset, dict)):
+            candidates = set(candidates)
+        return self.task_grid.k_nearest(self.position(uid), k, accept=candidates)
+
+    def agents_within(self, uid, radius):
+        """Returns the other agents within radius of a body at the start of the tick, nearest first."""
+        self.refresh_grids()
+        return [a for a in self.agent_grid.within_radius(self.position(uid), radius) if a != uid]
+
+    def set_position(self, uid, pos):
+        """Writes a teleported position back so later readers in the tick stay consistent."""
+        self.positions[self.index[uid], :len(pos)] = pos